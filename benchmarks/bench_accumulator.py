@@ -0,0 +1,65 @@
+#Compares evaluating every node of a search tree with the full network against the incremental first layer
+#Run from the repository root with: python -m benchmarks.bench_accumulator [depth]
+#Uses the trained model when nn/chess_eval.pth is present, otherwise a randomly initialised network
+
+import sys
+import time
+import torch
+
+import move_encoding
+from board import Board
+from move_generator import MoveGenerator
+from nn import data_prep
+from nn.model import EvalNetwork
+from benchmarks.models import load_model
+from nn.accumulator import Accumulator
+
+def _full_eval(model:EvalNetwork, board:Board)->float:
+    return float(model(data_prep.positions_to_input([board.position]))[0,0])
+
+def _accumulated_eval(model:EvalNetwork, board:Board)->float:
+    return float(model.forward_from_linear1(torch.from_numpy(board.accumulator.output(board.position)))[0])
+
+#Evaluates every node of the tree below the board, the way a search without pruning would, timing only the evaluations
+def _walk(move_generator:MoveGenerator, board:Board, depth:int, evaluate, model:EvalNetwork, scores:list,
+          eval_time:list)->None:
+    start = time.perf_counter()
+    scores.append(evaluate(model,board))
+    eval_time[0] += time.perf_counter() - start
+    if depth == 0:
+        return
+    for move in move_generator.generate_moves(board,False):
+        board.make_move(move)
+        _walk(move_generator,board,depth-1,evaluate,model,scores,eval_time)
+        board.unmake_move()
+
+def bench_accumulator(depth:int)->None:
+    model = load_model()
+    move_generator = MoveGenerator()
+    board = Board()
+    with torch.inference_mode():
+        full_scores = []
+        full_time = [0.0]
+        _walk(move_generator,board,depth,_full_eval,model,full_scores,full_time)
+
+        accumulator = Accumulator(model)
+        accumulator.reset(board.position)
+        board.accumulator = accumulator
+        accumulated_scores = []
+        accumulated_time = [0.0]
+        _walk(move_generator,board,depth,_accumulated_eval,model,accumulated_scores,accumulated_time)
+        board.accumulator = None
+
+    full_time, accumulated_time = full_time[0], accumulated_time[0]
+    nodes = len(full_scores)
+    deviation = max(abs(a - b) for a, b in zip(full_scores,accumulated_scores))
+    print(f"Evaluated {nodes} nodes to depth {depth} from the start position, evaluation time only")
+    print(f"  full forward pass:  {full_time:.2f} s, {full_time/nodes*1e6:.0f} us/node")
+    print(f"  accumulator:        {accumulated_time:.2f} s, {accumulated_time/nodes*1e6:.0f} us/node")
+    print(f"  refreshes: {accumulator.refreshes}, incremental updates: {accumulator.updates}")
+    print(f"  max output difference: {deviation:.2e}")
+    print(f"Speedup: {full_time/accumulated_time:.2f}x")
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    bench_accumulator(depth)
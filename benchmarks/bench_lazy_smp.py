@@ -0,0 +1,41 @@
+#Compares the Lazy SMP search against the single process search to the same depth
+#Run from the repository root with: python -m benchmarks.bench_lazy_smp [depth] [workers]
+
+import sys
+import time
+
+import move_encoding
+from board import Board
+from search import Search
+from parallel_search import LazySMPSearch, available_cpu_count
+from chess_enums import SearchMode
+
+def _search_time(search:Search, depth:int)->float:
+    board = Board()
+    search.transposition_table.clear()
+    start = time.perf_counter()
+    move, score = search.iterative_deepening(board,depth)
+    elapsed = time.perf_counter() - start
+    print(f"  best move: {move_encoding.decode_to_string_simple(move)}, score: {score}, time: {elapsed:.2f} s")
+    return elapsed
+
+def bench_lazy_smp(depth:int, workers:int)->None:
+    print(f"Single process search to depth {depth}")
+    single = Search(SearchMode.PVS)
+    single_time = _search_time(single,depth)
+    print(f"  nodes: {single.nodes + single.qnodes}")
+
+    print(f"Lazy SMP search to depth {depth} with {workers} workers")
+    with LazySMPSearch(workers) as parallel:
+        parallel.start_workers()
+        parallel_time = _search_time(parallel,depth)
+        stats = parallel.get_parallel_stats()
+        for worker in stats['workers']:
+            print(f"  worker {worker['worker']}: depth {worker['depth']}, nodes {worker['nodes'] + worker['qnodes']}, time {worker['time']:.2f} s")
+        print(f"  total nodes: {stats['total_nodes']}, {stats['nodes_per_second']:.0f} nodes/s")
+    print(f"Speedup: {single_time / parallel_time:.2f}x")
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else available_cpu_count()
+    bench_lazy_smp(depth,workers)
@@ -0,0 +1,72 @@
+#Benchmarks the per-node cost of the position representation
+#Run from the repository root with: python -m benchmarks.bench_position
+
+import sys
+import time
+from numpy import uint64 as u64
+
+import move_encoding
+import bb_utils
+from board import Board
+from position import Position
+from move_generator import MoveGenerator
+from chess_enums import Color,PieceType
+
+NODE_ITERATIONS = 200000
+
+#The work done on the masks for one node: read occupancy and side masks, then make and unmake a move
+def _node_ops_dict(color_masks, piece_masks, move_mask, piece, color):
+    occupied = color_masks[Color.WHITE.value] | color_masks[Color.BLACK.value]
+    friendly = color_masks[color]
+    enemy = occupied ^ friendly
+    piece_masks[piece] ^= move_mask
+    color_masks[color] ^= move_mask
+    piece_masks[piece] ^= move_mask
+    color_masks[color] ^= move_mask
+    return enemy
+
+def _time_layout(color_masks, piece_masks, move_mask)->float:
+    piece = PieceType.KNIGHT.value
+    color = Color.WHITE.value
+    start = time.perf_counter()
+    for i in range(NODE_ITERATIONS):
+        _node_ops_dict(color_masks,piece_masks,move_mask,piece,color)
+    return (time.perf_counter() - start) / NODE_ITERATIONS
+
+def bench_layout()->None:
+    position = Position()
+    legacy = position.to_u64_masks()
+    #Knight g1 to f3
+    move_mask = bb_utils.u64_from_index(1) | bb_utils.u64_from_index(18)
+    legacy_time = _time_layout(legacy['color'],legacy['piece'],u64(move_mask))
+    slots_time = _time_layout(position.color_masks,position.piece_masks,move_mask)
+    print("Mask operations per node")
+    print(f"  dict of numpy.uint64: {legacy_time*1e9:8.1f} ns")
+    print(f"  slots list of int:    {slots_time*1e9:8.1f} ns")
+    print(f"  speedup:              {legacy_time/slots_time:8.2f}x")
+
+def _perft(move_generator:MoveGenerator, board:Board, depth:int, annotate:bool)->int:
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in move_generator.generate_moves(board,annotate):
+        board.make_move(move)
+        nodes += _perft(move_generator,board,depth-1,annotate)
+        board.unmake_move()
+    return nodes
+
+def bench_perft(depth:int)->None:
+    move_generator = MoveGenerator()
+    board = Board()
+    print(f"Perft({depth}) from the start position")
+    for annotate in (True,False):
+        start = time.perf_counter()
+        nodes = _perft(move_generator,board,depth,annotate)
+        elapsed = time.perf_counter() - start
+        label = "annotated" if annotate else "unannotated"
+        print(f"  {label:11} nodes: {nodes}, time: {elapsed:.2f} s, {nodes/elapsed:.0f} nodes/s, {elapsed/nodes*1e6:.1f} us/node")
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    bench_layout()
+    bench_perft(depth)
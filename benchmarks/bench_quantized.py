@@ -0,0 +1,76 @@
+#Compares the quantized NumPy network against the float32 torch model on a sample of positions
+#Reports the score deviation in pawns, the weight sizes and the throughput of both in positions per second
+#Run from the repository root with: python -m benchmarks.bench_quantized [positions] [batch size]
+#Uses the trained model when nn/chess_eval.pth is present, otherwise a randomly initialised network
+
+import sys
+import time
+import random
+import numpy as np
+import torch
+
+import move_encoding
+from board import Board
+from move_generator import MoveGenerator
+from nn import data_prep
+from nn.model import EvalNetwork
+from nn.quantized import QuantizedEvalNetwork
+from benchmarks.models import load_model
+
+#Positions each throughput measurement runs
+THROUGHPUT_POSITIONS = 512
+
+#Positions from random games, a fixed seed keeps the sample the same between runs
+def _sample_positions(count:int, seed:int = 1)->list:
+    rand = random.Random(seed)
+    move_generator = MoveGenerator()
+    positions = []
+    board = Board()
+    while len(positions) < count:
+        moves = move_generator.generate_moves(board,False)
+        if len(moves) == 0 or len(board.undo_stack) >= 120:
+            board = Board()
+            continue
+        board.make_move(rand.choice(moves))
+        positions.append(board.position.copy())
+    return positions
+
+#Returns scores in pawns the way Evaluator.eval_inputs does
+def _torch_scores(model:EvalNetwork, features:np.ndarray)->np.ndarray:
+    with torch.inference_mode():
+        return model(torch.from_numpy(features))[:,0].numpy() * 20 - 10
+
+def _quantized_scores(model:QuantizedEvalNetwork, features:np.ndarray)->np.ndarray:
+    return model(features)[:,0] * 20 - 10
+
+#Positions per second when the features are scored batch_size at a time
+def _throughput(evaluate, features:np.ndarray, batch_size:int)->float:
+    start = time.perf_counter()
+    for i in range(0,len(features),batch_size):
+        evaluate(features[i:i+batch_size])
+    return len(features) / (time.perf_counter() - start)
+
+def bench_quantized(count:int, batch_size:int)->None:
+    model = load_model()
+    quantized = QuantizedEvalNetwork(model)
+    features = data_prep.positions_to_input(_sample_positions(count)).numpy().copy()
+
+    reference = _torch_scores(model,features)
+    deviation = np.abs(_quantized_scores(quantized,features) - reference)
+    fp32_bytes = sum(p.numel() * 4 for p in model.parameters())
+    print(f"Deviation from the float32 model over {count} positions, in pawns")
+    print(f"  mean: {deviation.mean():.4f}, max: {deviation.max():.4f}, 99th percentile: {np.percentile(deviation,99):.4f}")
+    print(f"  weights: {fp32_bytes / 1e6:.1f} MB float32, {quantized.size_bytes() / 1e6:.1f} MB quantized")
+
+    for size in sorted({1,batch_size}):
+        #the int32 matmuls are slow, so throughput is timed on the first positions only
+        sample = features[:THROUGHPUT_POSITIONS]
+        fp32_rate = _throughput(lambda batch: _torch_scores(model,batch),sample,size)
+        int8_rate = _throughput(lambda batch: _quantized_scores(quantized,batch),sample,size)
+        print(f"Batch size {size}: float32 torch {fp32_rate:.0f} positions/s, int8 NumPy {int8_rate:.0f} positions/s, "
+              f"{int8_rate / fp32_rate:.2f}x")
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    bench_quantized(count,batch_size)
@@ -0,0 +1,76 @@
+#Compares the root split search against sequential root searches to the same depth
+#Run from the repository root with: python -m benchmarks.bench_root_split [depth] [workers]
+#
+#The root split workers carry the best root score so far as alpha into every later root move, which cuts most of them
+#off early. That saves work on its own, so the parallel search is compared against a sequential search that carries
+#alpha the same way, running the workers' own task function in this process. The full window search of
+#Search.a_b_move_search is also reported, to show how much of the difference alpha sharing accounts for.
+#Every search starts from empty transposition tables, the workers' included.
+
+import sys
+import time
+import multiprocessing
+
+import move_encoding
+import parallel_search
+from board import Board
+from search import Search, INFINITY
+from move_ordering import mvv_lva, is_capture
+from parallel_search import RootSplitSearch, available_cpu_count
+from chess_enums import SearchMode
+
+def _report(label:str, elapsed:float, nodes:int)->None:
+    print(f"{label}")
+    print(f"  time: {elapsed:.2f} s, nodes: {nodes}, {nodes/elapsed:.0f} nodes/s")
+
+#Full window search of every root move
+def _full_window_search(depth:int):
+    search = Search(SearchMode.ROOT_SPLIT)
+    start = time.perf_counter()
+    search.a_b_move_search(Board(),depth)
+    return time.perf_counter() - start, search.nodes + search.qnodes, search.move_list[0][0]
+
+#The root split search's tasks run one after another in this process, in the order the pool is given them
+def _sequential_alpha_search(depth:int):
+    parallel_search._root_worker_init(16, multiprocessing.Value('d', -INFINITY), None, multiprocessing.Value('i', 0))
+    board = Board()
+    moves = parallel_search._worker_search.move_generator.generate_moves(board)
+    moves.sort(key=lambda move: mvv_lva(move) if is_capture(move) else -INFINITY, reverse=True)
+    packed_position = board.position.pack()
+    nodes = 0
+    best_move, best_score = moves[0], -INFINITY
+    start = time.perf_counter()
+    for move in moves:
+        score, exact, move_nodes, move_qnodes = parallel_search._root_worker_search(packed_position,int(move),depth)
+        nodes += move_nodes + move_qnodes
+        if score > best_score:
+            best_move, best_score = move, score
+    return time.perf_counter() - start, nodes, best_move
+
+def _root_split_search(depth:int, workers:int):
+    with RootSplitSearch(workers) as parallel:
+        #the first search starts the workers and loads their tables, the timed one starts from cleared tables
+        parallel.a_b_move_search(Board(),1)
+        parallel.clear_worker_tables()
+        start = time.perf_counter()
+        parallel.a_b_move_search(Board(),depth)
+        elapsed = time.perf_counter() - start
+        return elapsed, parallel.nodes + parallel.qnodes, parallel.move_list[0][0]
+
+def bench_root_split(depth:int, workers:int)->None:
+    full_time, full_nodes, full_move = _full_window_search(depth)
+    _report(f"Sequential full window root search to depth {depth}, best move "
+            f"{move_encoding.decode_to_string_simple(full_move)}", full_time, full_nodes)
+    alpha_time, alpha_nodes, alpha_move = _sequential_alpha_search(depth)
+    _report(f"Sequential root search carrying alpha to depth {depth}, best move "
+            f"{move_encoding.decode_to_string_simple(alpha_move)}", alpha_time, alpha_nodes)
+    split_time, split_nodes, split_move = _root_split_search(depth,workers)
+    _report(f"Root split search to depth {depth} with {workers} workers, best move "
+            f"{move_encoding.decode_to_string_simple(split_move)}", split_time, split_nodes)
+    print(f"Alpha sharing: {full_nodes / alpha_nodes:.2f}x fewer nodes than the full window search")
+    print(f"Parallel speedup over the sequential search carrying alpha: {alpha_time / split_time:.2f}x")
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else available_cpu_count()
+    bench_root_split(depth,workers)
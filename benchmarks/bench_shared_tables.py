@@ -0,0 +1,60 @@
+#Compares a MoveGenerator that loads its own tables with one attached to tables published in shared memory
+#Reports construction time and the memory each constructor keeps, and checks both generate the same moves
+#Run from the repository root with: python -m benchmarks.bench_shared_tables [workers]
+
+import sys
+import time
+import tracemalloc
+import multiprocessing
+
+import move_encoding
+from board import Board
+from move_generator import MoveGenerator
+
+def _perft(move_generator:MoveGenerator, board:Board, depth:int)->int:
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in move_generator.generate_moves(board,False):
+        board.make_move(move)
+        nodes += _perft(move_generator,board,depth-1)
+        board.unmake_move()
+    return nodes
+
+#Builds a generator in the worker and returns its construction time, the bytes it keeps and a perft count
+#The memory is measured on a second generator, tracing allocations slows the construction down several times
+#Memory mapped from the table files is not allocated by the process and is not counted
+def _worker(tables_name:str)->tuple:
+    start = time.perf_counter()
+    move_generator = MoveGenerator(tables_name)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    traced_generator = MoveGenerator(tables_name)
+    kept = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, kept, _perft(move_generator,Board(),3)
+
+def bench_shared_tables(workers:int)->None:
+    publisher = MoveGenerator()
+    tables = publisher.publish_tables()
+    print(f"Shared memory block: {tables.size_bytes()/1024:.0f} KB, "
+          f"of which the slider attack table, memory mapped by processes with their own tables: "
+          f"{publisher.slider_attacks.nbytes/1024:.0f} KB")
+    context = multiprocessing.get_context('spawn')
+    try:
+        with context.Pool(workers) as pool:
+            private = pool.map(_worker,[None]*workers)
+            shared = pool.map(_worker,[tables.name]*workers)
+    finally:
+        tables.close(unlink=True)
+    for label, results in (('own tables',private),('shared tables',shared)):
+        elapsed = sum(result[0] for result in results) / workers
+        kept = sum(result[1] for result in results) / workers
+        print(f"  {label:14} construction: {elapsed*1000:6.1f} ms, kept per process: {kept/1024:7.0f} KB, "
+              f"perft(3): {results[0][2]}")
+    if any(result[2] != private[0][2] for result in private + shared):
+        print("Perft counts differ between the generators")
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    bench_shared_tables(workers)
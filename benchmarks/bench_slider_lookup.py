@@ -0,0 +1,68 @@
+#Compares the per-square slider lookup against the lookup it replaced, in lookups per second
+#The old lookup counted the blocker mask bits on every call and went through _calc_magic_index
+#Run from the repository root with: python -m benchmarks.bench_slider_lookup [lookups]
+
+import sys
+import time
+import random
+import functools
+
+import move_encoding
+import bb_utils
+from move_generator import MoveGenerator
+
+def _old_lookup_rook_moves(generator:MoveGenerator, occupied:int, square_index:int)->int:
+    mask = generator.rook_blocker_table[square_index]
+    magic_index = generator._calc_magic_index(mask&occupied,generator.rook_magics[square_index],bb_utils.pop_count(mask))
+    return generator.slider_attacks.item(generator.rook_offsets[square_index] + magic_index)
+
+def _old_lookup_bishop_moves(generator:MoveGenerator, occupied:int, square_index:int)->int:
+    mask = generator.bishop_blocker_table[square_index]
+    magic_index = generator._calc_magic_index(mask&occupied,generator.bishop_magics[square_index],bb_utils.pop_count(mask))
+    return generator.slider_attacks.item(generator.bishop_offsets[square_index] + magic_index)
+
+def _old_lookup_queen_moves(generator:MoveGenerator, occupied:int, square_index:int)->int:
+    return _old_lookup_rook_moves(generator,occupied,square_index) | _old_lookup_bishop_moves(generator,occupied,square_index)
+
+#Random occupancies with about a quarter of the squares filled, each paired with a square
+def _samples(count:int, seed:int = 1)->list:
+    rand = random.Random(seed)
+    return [(rand.getrandbits(64) & rand.getrandbits(64), rand.randrange(64)) for i in range(count)]
+
+#Best of a few runs, the slower runs are other processes taking the CPU
+def _lookups_per_second(lookup, samples:list, runs:int = 3)->float:
+    best = 0.0
+    for run in range(runs):
+        start = time.perf_counter()
+        for occupied, square in samples:
+            lookup(occupied,square)
+        best = max(best, len(samples) / (time.perf_counter() - start))
+    return best
+
+def bench_slider_lookup(count:int)->None:
+    generator = MoveGenerator()
+    memory = generator.get_table_memory()
+    print(f"Slider attack table: {memory['bytes']/1024:.0f} KB, {memory['dense_bytes']/1024:.0f} KB in the 64 x 4096 layout")
+    samples = _samples(count)
+    pieces = (('rook',_old_lookup_rook_moves,generator._lookup_rook_moves,bb_utils.calc_rook_moves),
+              ('bishop',_old_lookup_bishop_moves,generator._lookup_bishop_moves,bb_utils.calc_bishop_moves))
+    for name, old_lookup, new_lookup, calc_moves in pieces:
+        #both lookups must agree with the moves calculated square by square
+        for occupied, square in samples[:1000]:
+            expected = calc_moves(square,occupied)
+            if old_lookup(generator,occupied,square) != expected or new_lookup(occupied,square) != expected:
+                print(f"{name} lookup mismatch on square {square} with occupancy {occupied:#x}")
+                return
+
+    pieces = (('rook',_old_lookup_rook_moves,generator._lookup_rook_moves),
+              ('bishop',_old_lookup_bishop_moves,generator._lookup_bishop_moves),
+              ('queen',_old_lookup_queen_moves,generator._lookup_queen_moves))
+    print(f"Slider lookups per second over {count} random occupancies")
+    for name, old_lookup, new_lookup in pieces:
+        old_rate = _lookups_per_second(functools.partial(old_lookup,generator),samples)
+        new_rate = _lookups_per_second(new_lookup,samples)
+        print(f"  {name:6}  before: {old_rate/1e6:.2f} M/s, after: {new_rate/1e6:.2f} M/s, {new_rate/old_rate:.2f}x")
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    bench_slider_lookup(count)
@@ -0,0 +1,78 @@
+#Reports how long the engine takes to start in a fresh interpreter, and what the first network evaluation adds
+#Each step runs in its own process so nothing is already imported, the slowest imports come from python -X importtime
+#Run from the repository root with: python -m benchmarks.bench_startup [module count]
+
+import sys
+import subprocess
+
+#Creates a search and runs a material only search, then prints the times and whether torch was imported
+_MATERIAL_STARTUP = '''
+import sys, time
+start = time.perf_counter()
+import move_encoding
+from board import Board
+from search import Search
+from chess_enums import SearchMode
+imported = time.perf_counter()
+search = Search(SearchMode.PVS)
+created = time.perf_counter()
+search.get_new_best_move(Board(),2)
+searched = time.perf_counter()
+print(imported - start, created - imported, searched - created, 'torch' in sys.modules)
+'''
+
+#Times the first network evaluation on its own, the model load fails without nn/chess_eval.pth and is then skipped
+_FIRST_NN_USE = '''
+import sys, time
+import move_encoding
+from search import Search
+search = Search()
+start = time.perf_counter()
+import torch
+imported = time.perf_counter()
+try:
+    search.evaluator.model
+    loaded = search.evaluator.model_load_time
+except FileNotFoundError:
+    loaded = -1.0
+print(imported - start, loaded)
+'''
+
+def _run(code:str, *options:str)->subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *options, '-c', code], capture_output=True, text=True, check=True)
+
+#Parses python -X importtime output into (self microseconds, module) pairs, slowest first
+#Self time leaves out the modules a module imports, so the cost is shown where it is spent
+def _slowest_imports(importtime_output:str, count:int)->list:
+    imports = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        imports.append((int(fields[0]), fields[2].strip()))
+    imports.sort(reverse=True)
+    return imports[:count]
+
+def bench_startup(count:int)->None:
+    import_time, create_time, search_time, torch_loaded = _run(_MATERIAL_STARTUP).stdout.split()[-4:]
+    print("Material only engine in a fresh process")
+    print(f"  import search: {float(import_time)*1000:.0f} ms")
+    print(f"  Search(): {float(create_time)*1000:.0f} ms")
+    print(f"  depth 2 material search: {float(search_time)*1000:.0f} ms")
+    print(f"  torch imported: {torch_loaded}")
+
+    torch_time, load_time = _run(_FIRST_NN_USE).stdout.split()[-2:]
+    print("First network evaluation")
+    print(f"  import torch: {float(torch_time)*1000:.0f} ms")
+    if float(load_time) < 0:
+        print("  model load: skipped, no trained model found")
+    else:
+        print(f"  model load: {float(load_time)*1000:.0f} ms")
+
+    print("Slowest imports of the material only engine, excluding what they import")
+    for microseconds, module in _slowest_imports(_run(_MATERIAL_STARTUP,'-X','importtime').stderr,count):
+        print(f"  {microseconds/1000:8.1f} ms  {module}")
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    bench_startup(count)
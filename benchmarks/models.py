@@ -0,0 +1,14 @@
+#Helpers shared by the benchmarks that run the evaluation network
+
+from nn import data_prep
+from nn.model import EvalNetwork
+
+def load_model()->EvalNetwork:
+    '''Returns the trained model in eval mode, or a randomly initialised network when no weights are found'''
+    try:
+        model = data_prep.get_model()
+    except FileNotFoundError:
+        print("No trained model found, using random weights")
+        model = EvalNetwork()
+    model.eval()
+    return model
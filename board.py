@@ -1,30 +1,43 @@
 #Contains the board representation for a given point in the game wrapped with some common operations
 import copy
-from typing import Dict
-from numpy import uint32 as u32, uint64 as u64
+from typing import List
+from numpy import uint32 as u32
 import collections
 
 import bb_utils
 import move_encoding
+import zobrist
 from position import Position
+from constants import Board as BD
 from chess_enums import GameState,Color,PieceType,Piece
 
+#State that cannot be recovered from the move code alone, the captured piece is kept in the move's destination
+UndoRecord = collections.namedtuple('UndoRecord', ['move','castle_index','en_passant_target_index','half_move_clock',
+                                                   'full_move_counter','game_state','zobrist_key'])
+
 class Board:
+    #When set, every move checks the incremental Zobrist key against a full recompute of the hash
+    verify_zobrist:bool = False
+
     def __init__(self,position: Position = Position())->None:
         if position != None:
             self.position = copy.deepcopy(position)
         else:
             self.position = copy.deepcopy(Position())
+        #One record per move made with make_move, popped by unmake_move
+        self.undo_stack:List[UndoRecord] = []
+        #Optional nn.accumulator.Accumulator, kept in step with the undo stack when set
+        self.accumulator = None
 
     #Used to get a deep copy of the board to allow for move search and validation
     def deep_copy(self)->'Board':
         return copy.deepcopy(Board(copy.deepcopy(self.position)))
 
-    def get_empty(self)->u64:
+    def get_empty(self)->int:
         '''Returns a mask of unoccupied squares'''
-        return ~(self.position.color_masks[Color.WHITE.value] | self.position.color_masks[Color.BLACK.value])
+        return BD.FULL ^ (self.position.color_masks[Color.WHITE.value] | self.position.color_masks[Color.BLACK.value])
     
-    def get_occupied(self)->u64:
+    def get_occupied(self)->int:
         '''Returns a mask of squares occupied by any piece'''
         return self.position.color_masks[Color.WHITE.value] | self.position.color_masks[Color.BLACK.value]
 
@@ -48,29 +61,6 @@ class Board:
             self.position.piece_masks[decoded_move[1].p_type.value] ^= (dest_mask)
             self.position.color_masks[decoded_move[1].p_color.value] ^= (dest_mask)
     
-    #Returns a copy of the position updated by a given move
-    def _copy_updated_masks(self, old_color_masks:Dict[Color,u64], old_piece_masks:Dict[PieceType,u64], move: u32)->Position:
-        color_masks = copy.deepcopy(old_color_masks)
-        piece_masks = copy.deepcopy(old_piece_masks)
-        decoded_move = move_encoding.decode_from_to(move)
-        source_index = decoded_move[0].square_index
-        dest_index = decoded_move[1].square_index
-        source_mask = bb_utils.u64_from_index(source_index)
-        dest_mask = bb_utils.u64_from_index(dest_index)
-        friendly_update_mask = source_mask|dest_mask
-        #Toggles the starting and ending positions for piece and color masks
-        piece_masks[decoded_move[0].p_type.value] ^= friendly_update_mask
-        color_masks[decoded_move[0].p_color.value] ^= friendly_update_mask
-
-        #If a piece is captured, toggle opponent color and piece masks as well
-        if decoded_move[1].p_type != PieceType.EMPTY:
-            piece_masks[decoded_move[1].p_type.value] ^= (dest_mask)
-            color_masks[decoded_move[1].p_color.value] ^= (dest_mask)
-
-        #Builds a tuple of the position's mask copies and returns it
-        Masks = collections.namedtuple('Masks', ['color','piece'])
-        return Masks(color_masks,piece_masks)
-    
     #Updates the current position by the specified move, also updating game state information
     def make_move(self, move_code: u32)->None:
         '''Updates the current board state for the given move code'''
@@ -78,6 +68,11 @@ class Board:
         source_piece:Piece = move_info.source
         dest_piece:Piece = move_info.destination
         move_type = move_info.info.move_type
+        old_castle_index = self._castle_index(self.position)
+        old_en_passant = self.position.en_passant_target_index
+        rook_toggle_mask = 0
+        self.undo_stack.append(UndoRecord(move_code,old_castle_index,old_en_passant,self.position.half_move_clock,
+                                          self.position.full_move_counter,self.position.game_state,self.position.zobrist_key))
         self._update_position(move_code)
 
         #Clear En passant target square
@@ -119,116 +114,146 @@ class Board:
         #King moves lose all castle rights
         elif source_piece.p_type == PieceType.KING:
             if self.position.w_to_move and source_piece.square_index == 3:
-                if self.position.w_k_castle:
-                    self.position.w_k_castle = False
-                elif self.position.w_q_castle:
-                    self.position.w_q_castle = False
+                self.position.w_k_castle = False
+                self.position.w_q_castle = False
             elif source_piece.square_index == 59:
-                if self.position.b_k_castle:
-                    self.position.b_k_castle = False
-                elif self.position.b_q_castle:
-                    self.position.b_q_castle = False
+                self.position.b_k_castle = False
+                self.position.b_q_castle = False
+        #Capturing a rook on its starting square removes the opponent's castle right on that side
+        if dest_piece.p_type == PieceType.ROOK:
+            if dest_piece.square_index == 0:
+                self.position.w_k_castle = False
+            elif dest_piece.square_index == 7:
+                self.position.w_q_castle = False
+            elif dest_piece.square_index == 56:
+                self.position.b_k_castle = False
+            elif dest_piece.square_index == 63:
+                self.position.b_q_castle = False
 
         #If the player castled, manually update the board to reflect it
         if move_type in [move_encoding.MoveType.QUEEN_CASTLE,move_encoding.MoveType.KING_CASTLE]:
-            if dest_piece.square_index == 1:
-                toggle_mask = u64(0x5)
-            elif dest_piece.square_index == 5:
-                toggle_mask = u64(0x90)
-            elif dest_piece.square_index == 57:
-                toggle_mask = u64(0x500000000000000)
-            elif dest_piece.square_index == 61:
-                toggle_mask = u64(0x9000000000000000)
-            else:
-                print("CASTLE MOVE INCORRECT")
+            toggle_mask = self._castle_rook_toggle(dest_piece.square_index)
             self.position.piece_masks[PieceType.ROOK.value] ^= toggle_mask
             self.position.color_masks[source_piece.p_color.value] ^= toggle_mask
+            rook_toggle_mask = toggle_mask
         
         #Update side to move
         self.position.w_to_move = not self.position.w_to_move
 
+        self._update_zobrist_key(self.position,source_piece,dest_piece,rook_toggle_mask,old_castle_index,old_en_passant)
+        if self.accumulator != None:
+            self.accumulator.push_move(source_piece,dest_piece)
+
     #Returns a copy of the current position if it were updated by the given move
     def make_move_copy(self, move_code: u32)->'Board':
         '''Returns a copy of the current board update with the given move code.
         
         Does NOT alter the current board state.'''
-        new_board = copy.deepcopy(self)
-        move_info = move_encoding.decode_move(move_code)
-        source_piece:Piece = move_info.source
-        dest_piece:Piece = move_info.destination
-        move_type = move_info.info.move_type
-        masks = self._copy_updated_masks(self.position.color_masks,self.position.piece_masks,move_code)
-        new_board.position.color_masks = masks[0]
-        new_board.position.piece_masks = masks[1]
+        new_board = Board(self.position)
+        new_board.make_move(move_code)
+        return new_board
 
-                #Clear En passant target square
-        self.position.en_passant_target_index = 64
+    #Reverts the last move made with make_move using its undo record
+    def unmake_move(self)->u32:
+        '''Restores the board to the state before the last move and returns that move'''
+        record:UndoRecord = self.undo_stack.pop()
+        move_code = record.move
+        #Toggling the same squares again removes the move from the masks
+        self._update_position(move_code)
+        move_info = move_encoding.decode_move(move_code)
+        if move_info.info.move_type in [move_encoding.MoveType.QUEEN_CASTLE,move_encoding.MoveType.KING_CASTLE]:
+            toggle_mask = self._castle_rook_toggle(move_info.destination.square_index)
+            moved_color = Color.BLACK.value if self.position.w_to_move else Color.WHITE.value
+            self.position.piece_masks[PieceType.ROOK.value] ^= toggle_mask
+            self.position.color_masks[moved_color] ^= toggle_mask
 
-        #After black makes a move, increment the full move counter
-        if not new_board.position.w_to_move:
-            new_board.position.full_move_counter += 1
+        self.position.w_to_move = not self.position.w_to_move
+        castle_index = record.castle_index
+        self.position.w_k_castle = bool(castle_index & 1)
+        self.position.w_q_castle = bool(castle_index & 2)
+        self.position.b_k_castle = bool(castle_index & 4)
+        self.position.b_q_castle = bool(castle_index & 8)
+        self.position.en_passant_target_index = record.en_passant_target_index
+        self.position.half_move_clock = record.half_move_clock
+        self.position.full_move_counter = record.full_move_counter
+        self.position.game_state = record.game_state
+        self.position.zobrist_key = record.zobrist_key
+        if self.accumulator != None:
+            self.accumulator.pop()
+        return move_code
 
-        #Reset the halfmove clock if the move was not a pawn move or a capture, otherwise increment it
-        if move_type in [move_encoding.MoveType.PAWN_MOVE,move_encoding.MoveType.CAPTURE]:
-            new_board.position.half_move_clock = 0
-            #If the pawn move was a double push, update the En Passant target square
-            if move_type in [move_encoding.MoveType.PAWN_MOVE] and abs(dest_piece.square_index-source_piece.square_index) == 16:
-                if source_piece.p_color == Color.WHITE:
-                    new_board.position.en_passant_target_index = source_piece.square_index+8
-                else:
-                    new_board.position.en_passant_target_index = source_piece.square_index-8
-        else:
-            new_board.position.half_move_clock += 1
+    #Passes the turn without moving a piece, used by null move pruning in the search
+    #Must not be used while the side to move is in check
+    def make_null_move(self)->None:
+        '''Gives the move to the other side, undone with unmake_null_move'''
+        old_en_passant = self.position.en_passant_target_index
+        self.undo_stack.append(UndoRecord(u32(0),self._castle_index(self.position),old_en_passant,self.position.half_move_clock,
+                                          self.position.full_move_counter,self.position.game_state,self.position.zobrist_key))
+        self.position.en_passant_target_index = 64
+        if not self.position.w_to_move:
+            self.position.full_move_counter += 1
+        self.position.half_move_clock += 1
+        self.position.w_to_move = not self.position.w_to_move
+        self.position.zobrist_key ^= zobrist.SIDE_KEY ^ zobrist.EN_PASSANT_KEYS[old_en_passant] ^ zobrist.EN_PASSANT_KEYS[64]
+        if self.accumulator != None:
+            self.accumulator.push_null_move()
 
-        #End the game via the 50 move rule if the halfmove clock reaches 50
-        if new_board.position.half_move_clock >= 50:
-            new_board.position.game_state = GameState.DRAW
+    def unmake_null_move(self)->None:
+        '''Reverts the last make_null_move'''
+        record:UndoRecord = self.undo_stack.pop()
+        self.position.w_to_move = not self.position.w_to_move
+        self.position.en_passant_target_index = record.en_passant_target_index
+        self.position.half_move_clock = record.half_move_clock
+        self.position.full_move_counter = record.full_move_counter
+        self.position.game_state = record.game_state
+        self.position.zobrist_key = record.zobrist_key
+        if self.accumulator != None:
+            self.accumulator.pop()
 
-        #Update appropriate castle rights
-        #Rook moves lose their castle right
-        if source_piece.p_type == PieceType.ROOK:
-            if new_board.position.w_to_move:
-                if new_board.position.w_k_castle and source_piece.square_index == 0:
-                    new_board.position.w_k_castle = False
-                elif new_board.position.w_q_castle and source_piece.square_index == 7:
-                    new_board.position.w_q_castle = False
+    #Takes back moves until the undo stack is back to the given size, used when a search is stopped part way
+    def unmake_to(self, stack_size:int)->None:
+        '''Reverts moves and null moves until only stack_size undo records are left'''
+        while len(self.undo_stack) > stack_size:
+            if self.undo_stack[-1].move == 0:
+                self.unmake_null_move()
             else:
-                if new_board.position.b_k_castle and source_piece.square_index == 56:
-                    new_board.position.b_k_castle = False
-                elif new_board.position.b_q_castle and source_piece.square_index == 63:
-                    new_board.position.b_q_castle = False
-        #King moves lose all castle rights
-        elif source_piece.p_type == PieceType.KING:
-            if new_board.position.w_to_move and source_piece.square_index == 3:
-                if new_board.position.w_k_castle:
-                    new_board.position.w_k_castle = False
-                elif new_board.position.w_q_castle:
-                    new_board.position.w_q_castle = False
-            elif source_piece.square_index == 59:
-                if new_board.position.b_k_castle:
-                    new_board.position.b_k_castle = False
-                elif new_board.position.b_q_castle:
-                    new_board.position.b_q_castle = False
+                self.unmake_move()
 
-        #If the player castled, manually update the board to reflect it
-        if move_type in [move_encoding.MoveType.QUEEN_CASTLE,move_encoding.MoveType.KING_CASTLE]:
-            if dest_piece.square_index == 1:
-                toggle_mask = u64(0x5)
-            elif dest_piece.square_index == 5:
-                toggle_mask = u64(0x90)
-            elif dest_piece.square_index == 57:
-                toggle_mask = u64(0x500000000000000)
-            elif dest_piece.square_index == 61:
-                toggle_mask = u64(0x9000000000000000)
-            else:
-                print("CASTLE MOVE INCORRECT")
-            new_board.position.piece_masks[PieceType.ROOK.value] ^= toggle_mask
-            new_board.position.color_masks[source_piece.p_color.value] ^= toggle_mask
-        
-        #Update side to move
-        new_board.position.w_to_move = not new_board.position.w_to_move
+    #Returns the rook squares toggled by a castle move landing the king on the given square
+    def _castle_rook_toggle(self, king_dest_index:int)->int:
+        if king_dest_index == 1:
+            return 0x5
+        elif king_dest_index == 5:
+            return 0x90
+        elif king_dest_index == 57:
+            return 0x500000000000000
+        elif king_dest_index == 61:
+            return 0x9000000000000000
+        print("CASTLE MOVE INCORRECT")
+        return 0
 
-        return new_board
+    def _castle_index(self, position:Position)->int:
+        return zobrist.castle_index(position.w_k_castle,position.w_q_castle,position.b_k_castle,position.b_q_castle)
+
+    #XORs the changes made by a move into the position's Zobrist key, called after the position has been updated
+    def _update_zobrist_key(self, position:Position, source_piece:Piece, dest_piece:Piece, rook_toggle_mask:int, old_castle_index:int, old_en_passant:int)->None:
+        key = position.zobrist_key
+        piece_keys = zobrist.PIECE_KEYS[source_piece.p_color.value][source_piece.p_type.value]
+        key ^= piece_keys[source_piece.square_index] ^ piece_keys[dest_piece.square_index]
+        if dest_piece.p_type != PieceType.EMPTY:
+            key ^= zobrist.PIECE_KEYS[dest_piece.p_color.value][dest_piece.p_type.value][dest_piece.square_index]
+        if rook_toggle_mask != 0:
+            rook_keys = zobrist.PIECE_KEYS[source_piece.p_color.value][PieceType.ROOK.value]
+            for square in bb_utils.get_piecewise_bits(rook_toggle_mask):
+                key ^= rook_keys[square]
+        key ^= zobrist.CASTLE_KEYS[old_castle_index] ^ zobrist.CASTLE_KEYS[self._castle_index(position)]
+        key ^= zobrist.EN_PASSANT_KEYS[old_en_passant] ^ zobrist.EN_PASSANT_KEYS[position.en_passant_target_index]
+        key ^= zobrist.SIDE_KEY
+        position.zobrist_key = key
+        if Board.verify_zobrist:
+            full_key = zobrist.hash_position(position)
+            if full_key != key:
+                raise RuntimeError(f"Incremental Zobrist key {key:#018x} does not match full hash {full_key:#018x}")
     
     #Returns the internal board's in check flag, must be updated first
     def self_in_check(self)->bool:
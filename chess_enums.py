@@ -42,6 +42,20 @@ class GameState(Enum):
     W_WINS = 2
     B_WINS = 3
 
+class SearchMode(Enum):
+    NN_ONE_PLY = 0
+    PVS = 1
+    #every root move gets its own subtree search, the scores fill the move list
+    ROOT_SPLIT = 2
+    #full width minimax whose leaves are scored by the network in batches
+    NN_BATCHED = 3
+
+#Bound of a stored search score, zero is reserved so an empty table slot can be detected
+class BoundType(Enum):
+    EXACT = 1
+    LOWER = 2
+    UPPER = 3
+
 class Piece():
     def __init__(self,color,piece_type,index) -> None:
         self.p_color: Color = color
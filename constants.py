@@ -1,91 +1,97 @@
 #Contains various constants related to bitboards and common FEN strings
 
-from numpy import uint64 as u64
 from dataclasses import dataclass
 from enum import Enum
 
+#Bitboards are plain Python ints, any result of ~ must be masked with FULL to stay within 64 bits
 @dataclass
 class Board:
-    EMPTY = u64(0)
-    FULL = u64(0xffffffffffffffff)
-
-    DEFAULT_W = u64(0x000000000000ffff)
-    DEFAULT_B = u64(0xffff000000000000)
-
-    DEFAULT_PAWN = u64(0x00ff00000000ff00)
-    DEFAULT_ROOK = u64(0x8100000000000081)
-    DEFAULT_KNIGHT = u64(0x4200000000000042)
-    DEFAULT_BISHOP = u64(0x2400000000000024)
-    DEFAULT_QUEEN = u64(0x1000000000000010)
-    DEFAULT_KING = u64(0x0800000000000008)
-
-    FILE_A = u64(0x8080808080808080)
-    FILE_B = u64(0x4040404040404040)
-    FILE_C = u64(0x2020202020202020)
-    FILE_D = u64(0x1010101010101010)
-    FILE_E = u64(0x0808080808080808)
-    FILE_F = u64(0x0404040404040404)
-    FILE_G = u64(0x0202020202020202)
-    FILE_H = u64(0x0101010101010101)
-
-    RANK_1 = u64(0x00000000000000ff)
-    RANK_2 = u64(0x000000000000ff00)
-    RANK_3 = u64(0x0000000000ff0000)
-    RANK_4 = u64(0x00000000ff000000)
-    RANK_5 = u64(0x000000ff00000000)
-    RANK_6 = u64(0x0000ff0000000000)
-    RANK_7 = u64(0x00ff000000000000)
-    RANK_8 = u64(0xff00000000000000)
-
-    DIAG_A8_A8 = u64(0x8000000000000000)
-    DIAG_A7_B8 = u64(0x4080000000000000)
-    DIAG_A6_C8 = u64(0x2040800000000000)
-    DIAG_A5_D8 = u64(0x1020408000000000)
-    DIAG_A4_E8 = u64(0x0810204080000000)
-    DIAG_A3_F8 = u64(0x0408102040800000)
-    DIAG_A2_G8 = u64(0x0204081020408000)
-    DIAG_A1_H8 = u64(0x0102040810204080)
-    DIAG_B1_H7 = u64(0x0001020408102040)
-    DIAG_C1_H6 = u64(0x0000010204081020)
-    DIAG_D1_H5 = u64(0x0000000102040810)
-    DIAG_E1_H4 = u64(0x0000000001020408)
-    DIAG_F1_H3 = u64(0x0000000000010204)
-    DIAG_G1_H2 = u64(0x0000000000000102)
-    DIAG_H1_H1 = u64(0x0000000000000001)
-
-    ADIAG_A1_A1 = u64(0x0000000000000080)
-    ADIAG_B1_A2 = u64(0x0000000000008040)
-    ADIAG_C1_A3 = u64(0x0000000000804020)
-    ADIAG_D1_A4 = u64(0x0000000080402010)
-    ADIAG_E1_A5 = u64(0x0000008040201008)
-    ADIAG_F1_A6 = u64(0x0000804020100804)
-    ADIAG_G1_A7 = u64(0x0080402010080402)
-    ADIAG_H1_A8 = u64(0x8040201008040201)
-    ADIAG_H2_B8 = u64(0x4020100804020100)
-    ADIAG_H3_C8 = u64(0x2010080402010000)
-    ADIAG_H4_D8 = u64(0x1008040201000000)
-    ADIAG_H5_E8 = u64(0x0804020100000000)
-    ADIAG_H6_F8 = u64(0x0402010000000000)
-    ADIAG_H7_G8 = u64(0x0201000000000000)
-    ADIAG_H8_H8 = u64(0x0100000000000000)
+    EMPTY = 0
+    FULL = 0xffffffffffffffff
+
+    DEFAULT_W = 0x000000000000ffff
+    DEFAULT_B = 0xffff000000000000
+
+    DEFAULT_PAWN = 0x00ff00000000ff00
+    DEFAULT_ROOK = 0x8100000000000081
+    DEFAULT_KNIGHT = 0x4200000000000042
+    DEFAULT_BISHOP = 0x2400000000000024
+    DEFAULT_QUEEN = 0x1000000000000010
+    DEFAULT_KING = 0x0800000000000008
+
+    FILE_A = 0x8080808080808080
+    FILE_B = 0x4040404040404040
+    FILE_C = 0x2020202020202020
+    FILE_D = 0x1010101010101010
+    FILE_E = 0x0808080808080808
+    FILE_F = 0x0404040404040404
+    FILE_G = 0x0202020202020202
+    FILE_H = 0x0101010101010101
+
+    RANK_1 = 0x00000000000000ff
+    RANK_2 = 0x000000000000ff00
+    RANK_3 = 0x0000000000ff0000
+    RANK_4 = 0x00000000ff000000
+    RANK_5 = 0x000000ff00000000
+    RANK_6 = 0x0000ff0000000000
+    RANK_7 = 0x00ff000000000000
+    RANK_8 = 0xff00000000000000
+
+    DIAG_A8_A8 = 0x8000000000000000
+    DIAG_A7_B8 = 0x4080000000000000
+    DIAG_A6_C8 = 0x2040800000000000
+    DIAG_A5_D8 = 0x1020408000000000
+    DIAG_A4_E8 = 0x0810204080000000
+    DIAG_A3_F8 = 0x0408102040800000
+    DIAG_A2_G8 = 0x0204081020408000
+    DIAG_A1_H8 = 0x0102040810204080
+    DIAG_B1_H7 = 0x0001020408102040
+    DIAG_C1_H6 = 0x0000010204081020
+    DIAG_D1_H5 = 0x0000000102040810
+    DIAG_E1_H4 = 0x0000000001020408
+    DIAG_F1_H3 = 0x0000000000010204
+    DIAG_G1_H2 = 0x0000000000000102
+    DIAG_H1_H1 = 0x0000000000000001
+
+    ADIAG_A1_A1 = 0x0000000000000080
+    ADIAG_B1_A2 = 0x0000000000008040
+    ADIAG_C1_A3 = 0x0000000000804020
+    ADIAG_D1_A4 = 0x0000000080402010
+    ADIAG_E1_A5 = 0x0000008040201008
+    ADIAG_F1_A6 = 0x0000804020100804
+    ADIAG_G1_A7 = 0x0080402010080402
+    ADIAG_H1_A8 = 0x8040201008040201
+    ADIAG_H2_B8 = 0x4020100804020100
+    ADIAG_H3_C8 = 0x2010080402010000
+    ADIAG_H4_D8 = 0x1008040201000000
+    ADIAG_H5_E8 = 0x0804020100000000
+    ADIAG_H6_F8 = 0x0402010000000000
+    ADIAG_H7_G8 = 0x0201000000000000
+    ADIAG_H8_H8 = 0x0100000000000000
 
     #The squares which must be empty for a castle
-    W_KING_CASTLE_MASK = u64(0x6)
-    W_QUEEN_CASTLE_MASK = u64(0x70)
-    B_KING_CASTLE_MASK = u64(0x600000000000000)
-    B_QUEEN_CASTLE_MASK = u64(0x7000000000000000)
+    W_KING_CASTLE_MASK = 0x6
+    W_QUEEN_CASTLE_MASK = 0x70
+    B_KING_CASTLE_MASK = 0x600000000000000
+    B_QUEEN_CASTLE_MASK = 0x7000000000000000
+
+    #The squares the king passes over during a castle, which must not be attacked
+    W_KING_CASTLE_PATH = 0x6
+    W_QUEEN_CASTLE_PATH = 0x30
+    B_KING_CASTLE_PATH = 0x600000000000000
+    B_QUEEN_CASTLE_PATH = 0x3000000000000000
 
     #The squares where the castle can occur
-    W_KING_CASTLE_SQUARE = u64(0x2)
-    W_QUEEN_CASTLE_SQUARE = u64(0x20)
-    B_KING_CASTLE_SQUARE = u64(0x200000000000000)
-    B_QUEEN_CASTLE_SQUARE = u64(0x2000000000000000)
+    W_KING_CASTLE_SQUARE = 0x2
+    W_QUEEN_CASTLE_SQUARE = 0x20
+    B_KING_CASTLE_SQUARE = 0x200000000000000
+    B_QUEEN_CASTLE_SQUARE = 0x2000000000000000
 
-    PERIMETER = u64(0xff018101810181ff)
-    CORNERS = u64(0x8100000000000081)
+    PERIMETER = 0xff018101810181ff
+    CORNERS = 0x8100000000000081
 
-    CENTER = u64(0x0000001818000000)
-    EXTENDED_CENTER = u64(0x00003c3c3c3c0000)
+    CENTER = 0x0000001818000000
+    EXTENDED_CENTER = 0x00003c3c3c3c0000
 
     SQUARES_BY_INDEX = ['h1','g1','f1','e1','d1','c1','b1','a1',
                         'h2','g2','f2','e2','d2','c2','b2','a2',
@@ -0,0 +1,111 @@
+#Bounded cache of position evaluations, keyed by the 64 bit Zobrist hash of the position
+#
+#The same position is often evaluated many times: through transpositions, when iterative deepening searches it again
+#one ply deeper, and when the engine's moves are displayed and then played in the same turn.
+#
+#Keys
+#---------
+#The material evaluation only depends on the pieces, so the Zobrist key is used as is. The network also sees the
+#half move clock, which the Zobrist key leaves out, so network scores are keyed by the Zobrist key XOR a key for the
+#clock value and a key that keeps them apart from material scores of the same position.
+#
+#Eviction
+#---------
+#The cache holds at most max_entries scores. Once it is full a clock sweep picks the entry to replace: every hit sets
+#the entry's referenced flag, the hand moves around the slots clearing flags and evicts the first entry found without
+#one. Entries that keep being hit stay, which approximates LRU without reordering anything on a hit.
+
+import random
+from typing import Dict, List, Optional
+
+#Default entry budget, a few tens of MB of Python objects
+EVAL_CACHE_ENTRIES = 1 << 17
+
+_SEED = 0x3E7A1C55
+_rand = random.Random(_SEED)
+
+#XORed into the key of every network score
+NN_KEY:int = _rand.getrandbits(64)
+#One key per half move clock value, the clock is reset well before it wraps around
+HALF_MOVE_KEYS:List[int] = [_rand.getrandbits(64) for i in range(256)]
+
+def material_key(position)->int:
+    return position.zobrist_key
+
+def nn_key(position)->int:
+    return position.zobrist_key ^ NN_KEY ^ HALF_MOVE_KEYS[position.half_move_clock & 0xff]
+
+class EvalCache():
+    '''Fixed size map of position keys to scores with clock eviction'''
+    def __init__(self, max_entries:int = EVAL_CACHE_ENTRIES) -> None:
+        self.max_entries = max(1, max_entries)
+        #key to slot index, the slots hold the key, score and referenced flag of each entry
+        self.slots:Dict[int,int] = {}
+        self.keys:List[int] = [0] * self.max_entries
+        self.scores:List[float] = [0.0] * self.max_entries
+        self.referenced = bytearray(self.max_entries)
+        self.hand = 0
+        self.reset_stats()
+
+    def __len__(self)->int:
+        return len(self.slots)
+
+    def clear(self)->None:
+        '''Removes every entry from the cache and resets the counters'''
+        self.slots.clear()
+        self.referenced = bytearray(self.max_entries)
+        self.hand = 0
+        self.reset_stats()
+
+    def reset_stats(self)->None:
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def probe(self, key:int)->Optional[float]:
+        '''Returns the cached score for the key, or None if it is not in the cache'''
+        slot = self.slots.get(key)
+        if slot == None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.referenced[slot] = 1
+        return self.scores[slot]
+
+    def store(self, key:int, score:float)->None:
+        '''Adds a score to the cache, evicting an entry if the cache is full'''
+        slot = self.slots.get(key)
+        if slot == None:
+            if len(self.slots) < self.max_entries:
+                slot = len(self.slots)
+            else:
+                slot = self._evict()
+            self.slots[key] = slot
+            self.keys[slot] = key
+        self.scores[slot] = score
+        self.stores += 1
+
+    #Moves the clock hand to the first entry that has not been hit since the hand last passed it and frees its slot
+    def _evict(self)->int:
+        referenced = self.referenced
+        hand = self.hand
+        while referenced[hand]:
+            referenced[hand] = 0
+            hand += 1
+            if hand == self.max_entries:
+                hand = 0
+        del self.slots[self.keys[hand]]
+        self.hand = hand + 1 if hand + 1 < self.max_entries else 0
+        self.evictions += 1
+        return hand
+
+    def hit_rate(self)->float:
+        probes = self.hits + self.misses
+        return self.hits / probes if probes > 0 else 0.0
+
+    def get_stats(self)->Dict[str,float]:
+        '''Returns the hit, miss and eviction counters along with how full the cache is'''
+        return {'entries':len(self.slots), 'max_entries':self.max_entries,
+                'hits':self.hits, 'misses':self.misses, 'hit_rate':self.hit_rate(),
+                'stores':self.stores, 'evictions':self.evictions}
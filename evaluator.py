@@ -1,17 +1,53 @@
 #Evaluates the given board position, contains a static material evaluator or the evaluation Neural Network
+#
+#torch and the network weights are only loaded on the first network evaluation, so searches and processes that only
+#use the material evaluation never pay for them.
 
 from board import Board
+from position import Position
 from chess_enums import *
 import bb_utils
 import random
-from nn import data_prep
+from typing import Dict, List
+import time
+import numpy as np
+from nn.accumulator import Accumulator
 import move_encoding
+from eval_cache import EvalCache, EVAL_CACHE_ENTRIES, material_key, nn_key
+
+#Material value of each piece type in pawns
+PIECE_VALUES = {PieceType.PAWN.value:1.0,PieceType.BISHOP.value:3.0,PieceType.KNIGHT.value:3.0,
+                PieceType.ROOK.value:5.0,PieceType.QUEEN.value:9.0,PieceType.KING.value:100.0}
 
 class Evaluator():
-    def __init__(self) -> None:
+    def __init__(self, cache_entries:int = EVAL_CACHE_ENTRIES, model_path:str = None) -> None:
         self.rand = random.Random()
-        #Neural Network Model
-        self.model = data_prep.get_model()
+        #Neural Network Model, loaded by the model property on first use
+        self.model_path = model_path
+        self._model = None
+        self.model_load_time = 0.0
+        self.input_buffer:np.ndarray = None
+        self.accumulator:Accumulator = None
+        #Scores of positions already evaluated by either path, None when cache_entries is 0
+        self.cache = EvalCache(cache_entries) if cache_entries > 0 else None
+
+    @property
+    def model(self):
+        '''The evaluation network, torch is imported and the weights are loaded the first time it is used'''
+        if self._model == None:
+            start = time.perf_counter()
+            from nn import data_prep
+            self._model = data_prep.get_model(self.model_path)
+            self.model_load_time = time.perf_counter() - start
+        return self._model
+
+    @model.setter
+    def model(self, model)->None:
+        self._model = model
+        #the accumulator holds the old model's first layer, and the cached network scores came from the old model
+        self.accumulator = None
+        if self.cache != None:
+            self.cache.clear()
 
     #Either returns the material evaluation, or inputs the board state into the evaluation network to and returns the result
     #Neural network result is the range -10 to +10, shifted to be non-negative, then compressed to between 0 and 1
@@ -19,19 +55,88 @@ class Evaluator():
     def eval_board(self, board:Board, use_nn:bool = False):
         eval = 0.0
         if not use_nn:
+            key = material_key(board.position)
+            cached = self.cache.probe(key) if self.cache != None else None
+            if cached != None:
+                return cached
             eval += self.static_material_eval(board)
+        elif board.accumulator != None:
+            key = nn_key(board.position)
+            cached = self.cache.probe(key) if self.cache != None else None
+            if cached != None:
+                return cached
+            eval = self.eval_accumulated(board)
         else:
-            self.model.eval()
-            eval = self.model(data_prep.fen_to_input(move_encoding.generate_FEN(board)))[0]
-            eval = (eval*20) - 10
+            #eval_inputs checks and fills the cache itself
+            return self.eval_inputs([board.position])[0]
+        if self.cache != None:
+            self.cache.store(key,eval)
         return eval
+
+    def get_accumulator(self)->Accumulator:
+        '''Returns the incremental first layer for the model, attach it to a board to use it in eval_board'''
+        if self.accumulator == None:
+            self.accumulator = Accumulator(self.model)
+        return self.accumulator
+
+    #Only layers 2 to 6 are run, the first layer output comes from the board's accumulator
+    def eval_accumulated(self, board:Board)->float:
+        import torch
+        self.model.eval()
+        with torch.inference_mode():
+            output = self.model.forward_from_linear1(torch.from_numpy(board.accumulator.output(board.position)))
+        return float(output[0] * 20 - 10)
+
+    #Scores every board with one forward pass of the network, much cheaper per board than calling eval_board for each
+    def eval_boards(self, boards:List[Board], use_nn:bool = True)->List[float]:
+        '''Returns the evaluation of each board from white's point of view'''
+        if not use_nn:
+            return [self.eval_board(board) for board in boards]
+        return self.eval_inputs([board.position for board in boards])
+
+    def board_input(self, board:Board)->Position:
+        '''Returns what eval_inputs needs to score the board later, inputs can be collected while searching'''
+        return board.position.copy()
+
+    def eval_inputs(self, inputs:List[Position])->List[float]:
+        '''Runs the network on a batch of inputs from board_input and returns the scores in pawns'''
+        if len(inputs) == 0:
+            return []
+        scores:List[float] = [None] * len(inputs)
+        keys = [nn_key(position) for position in inputs]
+        #only positions missing from the cache go through the network
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.cache.probe(key) if self.cache != None else None
+            if cached == None:
+                missing.append(i)
+            else:
+                scores[i] = cached
+        if len(missing) == 0:
+            return scores
+        import torch
+        from nn import data_prep
+        #features are written into a buffer kept between calls, it only grows when a larger batch arrives
+        if self.input_buffer is None or self.input_buffer.shape[0] < len(missing):
+            self.input_buffer = np.empty((len(missing),data_prep.INPUT_SIZE), np.float32)
+        self.model.eval()
+        with torch.inference_mode():
+            output = self.model(data_prep.positions_to_input([inputs[i] for i in missing],self.input_buffer))
+        for i, score in zip(missing,((output[:,0] * 20) - 10).tolist()):
+            scores[i] = score
+            if self.cache != None:
+                self.cache.store(keys[i],score)
+        return scores
     
+    def get_cache_stats(self)->Dict[str,float]:
+        '''Returns the evaluation cache counters, empty when the cache is disabled'''
+        return self.cache.get_stats() if self.cache != None else {}
+
     #Simple evaluation by summing piece values
     def static_material_eval(self, board:Board)->float:
         w_sum = 0.0
         b_sum = 0.0
-        point_value = {PieceType.PAWN.value:1.0,PieceType.BISHOP.value:3.0,PieceType.KNIGHT.value:3.0,
-                       PieceType.ROOK.value:5.0,PieceType.QUEEN.value:9.0,PieceType.KING.value:100.0}
+        point_value = PIECE_VALUES
         for key in point_value.keys():
             mask = board.position.piece_masks[key]
             w_mask = mask & board.position.color_masks[Color.WHITE.value]
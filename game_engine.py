@@ -2,8 +2,8 @@
 
 from board import Board
 from search import Search
+from search_limits import SearchLimits
 from numpy import uint32 as u32
-from typing import Tuple
 import move_encoding
 import bb_utils
 from chess_enums import *
@@ -19,8 +19,8 @@ class GameEngine():
         self.board.position = copy.deepcopy(board.position)
 
     #Searches for the best move, then plays it and returns the move
-    def make_engine_move(self)->u32:
-        move = self._search_best_move()
+    def make_engine_move(self, limits:SearchLimits = None)->u32:
+        move = self._search_best_move(limits)
         if move == 0:
             print("NO VALID MOVES")
         else:
@@ -111,6 +111,9 @@ class GameEngine():
         new_code = move_encoding.encode(source,dest,new_special)
         return new_code
 
-    #Returns the best move determined by the search algorithm,
-    def _search_best_move(self)->Tuple[u32,float]:
+    #Returns the best move determined by the search algorithm
+    #With limits a PVS search is run whatever the search mode, it is the only one that stops at time, node or depth limits
+    def _search_best_move(self, limits:SearchLimits = None)->u32:
+        if limits != None:
+            return self.search.get_limited_best_move(self.board,limits)
         return self.search.get_new_best_move(self.board)
\ No newline at end of file
@@ -7,6 +7,7 @@ import numpy as np
 from numpy import uint32 as u32, uint64 as u64
 
 import move_encoding
+import zobrist
 from game_engine import GameEngine
 from position import Position
 from board import Board
@@ -148,7 +149,7 @@ class GameInterface:
             bit_list = ['0']*64
             for m in [match.start() for match in re.finditer(pattern,fen)]:
                 bit_list[m] = '1'
-            return np.uint64(int(''.join(bit_list),2))
+            return int(''.join(bit_list),2)
 
         fen_components = fen_str.split(" ")
 
@@ -189,6 +190,7 @@ class GameInterface:
             pos.en_passant_target_index = move_encoding.square_str_to_index(fen_components[3])
         pos.half_move_clock = int(fen_components[4])
         pos.full_move_counter = int(fen_components[5])
+        pos.zobrist_key = zobrist.hash_position(pos)
 
         self.board.position = pos
 
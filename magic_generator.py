@@ -0,0 +1,198 @@
+#Builds the slider attack table from the magic numbers, and searches for new magic numbers
+#
+#Every blocker subset of a square's mask is enumerated with the carry-rippler trick, subset = (subset - mask) & mask,
+#and the attacks of all of them are computed at once with NumPy by walking each ray one square at a time.
+#A magic is valid when every pair of subsets that lands on the same index also has the same attacks, which is checked
+#by writing all attacks into a table and reading them back.
+#The search checks a batch of random candidates at once: candidates that can't spread the mask into the top byte are
+#dropped, the rest are checked on a sample of the subsets, and only the few that pass are checked on every subset.
+#
+#Run this file to rebuild tables/slider_attack_table.npy from the stored magic numbers, or with --search to find new
+#magic numbers first. --workers spreads the search over a process pool, one task per square.
+
+import sys
+import time
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import table_files
+
+#(rank step, file step) of the rays of each piece
+ROOK_DIRECTIONS = ((1,0),(-1,0),(0,1),(0,-1))
+BISHOP_DIRECTIONS = ((1,1),(1,-1),(-1,1),(-1,-1))
+
+#Random candidates tried per square before the search gives up
+MAX_CANDIDATES = 10000000
+#Candidates drawn from the generator at a time
+CANDIDATE_BATCH = 4096
+#Candidates checked together, bounds the size of the scratch table
+CHECK_BATCH = 256
+#Subsets in the first, cheaper check of each candidate
+SAMPLE_SUBSETS = 256
+
+#Bits set in each byte value
+_BYTE_POP_COUNT = np.array([bin(i).count('1') for i in range(256)], np.uint8)
+
+def _rays(square:int, directions)->List[List[int]]:
+    '''Returns the squares of each ray from the square to the edge of the board, nearest first'''
+    rank, file = divmod(square, 8)
+    rays = []
+    for rank_step, file_step in directions:
+        ray = []
+        r, f = rank + rank_step, file + file_step
+        while 0 <= r < 8 and 0 <= f < 8:
+            ray.append(r * 8 + f)
+            r, f = r + rank_step, f + file_step
+        rays.append(ray)
+    return rays
+
+def blocker_mask(square:int, directions)->int:
+    '''Returns the squares whose pieces can block the slider, every ray square except the last one'''
+    mask = 0
+    for ray in _rays(square, directions):
+        for ray_square in ray[:-1]:
+            mask |= 1 << ray_square
+    return mask
+
+def blocker_subsets(mask:int)->np.ndarray:
+    '''Returns every subset of the mask, enumerated with the carry-rippler trick'''
+    subsets = []
+    subset = 0
+    while True:
+        subsets.append(subset)
+        subset = (subset - mask) & mask
+        if subset == 0:
+            break
+    return np.array(subsets, np.uint64)
+
+def slider_attacks(square:int, directions, subsets:np.ndarray)->np.ndarray:
+    '''Returns the attacks of the slider on the square for each blocker subset'''
+    attacks = np.zeros(len(subsets), np.uint64)
+    for ray in _rays(square, directions):
+        open_ray = np.ones(len(subsets), bool)
+        for ray_square in ray:
+            bit = np.uint64(1 << ray_square)
+            attacks[open_ray] |= bit
+            open_ray &= (subsets & bit) == 0
+    return attacks
+
+def magic_indices(subsets:np.ndarray, magic:int, shift:int)->np.ndarray:
+    #uint64 array products wrap around at 64 bits, the same truncation the lookup does with a mask
+    return ((subsets * np.uint64(magic)) >> np.uint64(shift)).astype(np.intp)
+
+def fill_square(subsets:np.ndarray, attacks:np.ndarray, magic:int, shift:int)->Optional[np.ndarray]:
+    '''Returns the square's table for the magic, or None if two subsets with different attacks share an index'''
+    indices = magic_indices(subsets, magic, shift)
+    table = np.zeros(1 << (64 - shift), np.uint64)
+    table[indices] = attacks
+    if not np.array_equal(table[indices], attacks):
+        return None
+    return table
+
+#Returns which of the magics give no collisions on the subsets, each candidate fills its own part of one scratch table
+def _collision_free(subsets:np.ndarray, attacks:np.ndarray, magics:np.ndarray, shift:int)->np.ndarray:
+    size = 1 << (64 - shift)
+    indices = ((subsets[None,:] * magics[:,None]) >> np.uint64(shift)).astype(np.intp)
+    indices += (np.arange(len(magics)) * size)[:,None]
+    table = np.zeros(len(magics) * size, np.uint64)
+    table[indices] = attacks[None,:]
+    return (table[indices] == attacks[None,:]).all(axis=1)
+
+def find_magic(square:int, rook:bool, seed:int = 0)->Tuple[int,int]:
+    '''Searches random sparse numbers for a magic of the square, returns the magic and the candidates drawn'''
+    directions = ROOK_DIRECTIONS if rook else BISHOP_DIRECTIONS
+    mask = blocker_mask(square, directions)
+    subsets = blocker_subsets(mask)
+    attacks = slider_attacks(square, directions, subsets)
+    shift = 64 - bin(mask).count('1')
+    rng = np.random.default_rng([seed, square, int(rook)])
+    sample = rng.permutation(len(subsets))[:SAMPLE_SUBSETS]
+    sample_subsets, sample_attacks = subsets[sample], attacks[sample]
+    tried = 0
+    while tried < MAX_CANDIDATES:
+        #numbers with few bits set make good magics, the AND of three random numbers has about 8 of 64
+        candidates = (rng.integers(0, 2**64, CANDIDATE_BATCH, np.uint64, endpoint=False)
+                      & rng.integers(0, 2**64, CANDIDATE_BATCH, np.uint64, endpoint=False)
+                      & rng.integers(0, 2**64, CANDIDATE_BATCH, np.uint64, endpoint=False))
+        #a magic has to spread the mask's bits into the top byte of the product to have a chance
+        top_bytes = ((candidates * np.uint64(mask)) >> np.uint64(56)).astype(np.uint8)
+        candidates = candidates[_BYTE_POP_COUNT[top_bytes] >= 6]
+        tried += CANDIDATE_BATCH
+        for start in range(0, len(candidates), CHECK_BATCH):
+            batch = candidates[start:start+CHECK_BATCH]
+            batch = batch[_collision_free(sample_subsets, sample_attacks, batch, shift)]
+            if len(batch) > 0:
+                passed = np.flatnonzero(_collision_free(subsets, attacks, batch, shift))
+                if len(passed) > 0:
+                    return int(batch[passed[0]]), tried
+    raise RuntimeError(f"No magic found for {'rook' if rook else 'bishop'} square {square}")
+
+def _find_magic_task(task:Tuple[int,bool,int])->Tuple[int,int]:
+    return find_magic(*task)
+
+def find_magics(rook:bool, seed:int = 0, workers:int = 1)->Tuple[List[int],int]:
+    '''Returns a magic for every square and the total candidates drawn, searched by a process pool when workers > 1'''
+    tasks = [(square, rook, seed) for square in range(64)]
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(_find_magic_task, tasks))
+    else:
+        results = [_find_magic_task(task) for task in tasks]
+    return [magic for magic, tried in results], sum(tried for magic, tried in results)
+
+def build_slider_table(rook_magics:List[int], bishop_magics:List[int])->np.ndarray:
+    '''Returns the slider attack table in the layout of table_files.slider_offsets, raises if a magic collides'''
+    rook_masks = [blocker_mask(square, ROOK_DIRECTIONS) for square in range(64)]
+    bishop_masks = [blocker_mask(square, BISHOP_DIRECTIONS) for square in range(64)]
+    rook_offsets, bishop_offsets, size = table_files.slider_offsets(rook_masks, bishop_masks)
+    table = np.zeros(size, np.uint64)
+    for directions, masks, magics, offsets in ((ROOK_DIRECTIONS,rook_masks,rook_magics,rook_offsets),
+                                              (BISHOP_DIRECTIONS,bishop_masks,bishop_magics,bishop_offsets)):
+        for square in range(64):
+            subsets = blocker_subsets(masks[square])
+            square_table = fill_square(subsets, slider_attacks(square, directions, subsets), magics[square],
+                                       64 - bin(masks[square]).count('1'))
+            if square_table is None:
+                raise ValueError(f"Magic {magics[square]:#x} collides on square {square}")
+            table[offsets[square]:offsets[square]+len(square_table)] = square_table
+    return table
+
+def _save_magic_numbers(name:str, magics:List[int])->None:
+    with open(table_files.table_path(name, '.txt'), 'w') as f:
+        f.write('\n'.join(str(magic) for magic in magics))
+    table_files.save_table(name, magics)
+
+def main(arguments:List[str])->None:
+    parser = argparse.ArgumentParser(description="Builds the slider attack table, optionally from newly searched magics")
+    parser.add_argument('--search', action='store_true', help="search for new magic numbers and save them first")
+    parser.add_argument('--workers', type=int, default=1, help="processes used by the search")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the search")
+    args = parser.parse_args(arguments)
+
+    #the stored blocker tables must match the masks the generator builds, the lookup uses the stored ones
+    for name, directions in (('rook_blockers_table',ROOK_DIRECTIONS),('bishop_blockers_table',BISHOP_DIRECTIONS)):
+        stored = table_files.load_table(name)
+        if stored is not None and stored.tolist() != [blocker_mask(square, directions) for square in range(64)]:
+            raise ValueError(f"tables/{name} does not match the generated blocker masks")
+
+    start = time.perf_counter()
+    if args.search:
+        rook_magics, rook_tried = find_magics(True, args.seed, args.workers)
+        bishop_magics, bishop_tried = find_magics(False, args.seed, args.workers)
+        print(f"Found 128 magics from {rook_tried + bishop_tried} candidates in {time.perf_counter() - start:.2f} s")
+        _save_magic_numbers('rook_magic_numbers', rook_magics)
+        _save_magic_numbers('bishop_magic_numbers', bishop_magics)
+    else:
+        rook_magics = table_files.load_table('rook_magic_numbers').tolist()
+        bishop_magics = table_files.load_table('bishop_magic_numbers').tolist()
+
+    table_start = time.perf_counter()
+    table = build_slider_table(rook_magics, bishop_magics)
+    table_files.save_table(table_files.SLIDER_TABLE, table)
+    print(f"Built {len(table)} entries in {time.perf_counter() - table_start:.2f} s, "
+          f"saved to {table_files.table_path(table_files.SLIDER_TABLE)}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
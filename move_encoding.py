@@ -1,7 +1,7 @@
 # Various conversions between move formats. 
 # For performance, internally moves are encoded into 32bit unsigned integers, containing source, destination, and move type information
 import numpy as np
-from numpy import uint32 as u32,uint64 as u64
+from numpy import uint32 as u32
 
 import bb_utils
 from chess_enums import *
@@ -101,7 +101,7 @@ def square_str_to_index(square_string:str)->int:
 
 #Generates the FEN for the given board position
 def generate_FEN(board:Board)->str:
-        def _FEN_helper(fen:str, bb:u64, piece:str)->str:
+        def _FEN_helper(fen:str, bb:int, piece:str)->str:
             bits_str = "{:064b}".format(bb,'b')
             for i in range(len(bits_str)):
                 if bits_str[i] == '1':
@@ -167,17 +167,19 @@ def _encode_special(special:Special):
     return encoded
 
 def _decode_piece(encoded_piece:u32, is_source:bool):
+    #Decoded fields are plain ints so square indexes can be shifted into int bitboards
+    encoded_piece = int(encoded_piece)
     if is_source == False:
         encoded_piece >>= 10
-    square_index = encoded_piece & u32(0x3f)
-    p_type = PieceType((encoded_piece&u32(0x1c0)) >> 6)
-    color = Color.WHITE if (encoded_piece & u32(0x200)) >> 9 == 0 else Color.BLACK
+    square_index = encoded_piece & 0x3f
+    p_type = PieceType((encoded_piece&0x1c0) >> 6)
+    color = Color.WHITE if (encoded_piece & 0x200) >> 9 == 0 else Color.BLACK
     result = Piece(color,p_type,square_index)
     return result
 
 def _decode_special(encoded_move:u32):
-    encoded_move >>= 20
-    move_type = MoveType(encoded_move & u32(0xf))
-    check_type = CheckFlags((encoded_move & u32(0x30)) >> 4)
+    encoded_move = int(encoded_move) >> 20
+    move_type = MoveType(encoded_move & 0xf)
+    check_type = CheckFlags((encoded_move & 0x30) >> 4)
     special = Special(move_type,check_type)
     return special
@@ -1,15 +1,17 @@
 #Contains the core components needed to generate valid moves on the given board position
 
 import sys
-import csv
-import warnings
 import numpy as np
-from numpy import uint64 as u64
+from numpy import uint64 as u64, uint32 as u32
+from typing import Optional
 
 from constants import Direction as DIR
 from constants import Board as BD
 import move_encoding
 import bb_utils
+import table_files
+import magic_generator
+from shared_tables import SharedTables
 
 from board import Board
 from position import Position
@@ -17,7 +19,13 @@ from chess_enums import Color,PieceType
 
 class MoveGenerator():
     '''Generates all valid moves for a given board'''
-    def __init__(self) -> None:
+    def __init__(self, shared_tables:Optional[str] = None) -> None:
+        '''With shared_tables, attaches to the tables another process published with publish_tables'''
+        self.shared_tables:Optional[SharedTables] = None
+        if shared_tables != None:
+            self._attach_shared_tables(shared_tables)
+            self._build_slider_lookup()
+            return
         #Load all of the attack tables from file
         self._generate_basic_attack_tables()
         self._load_slider_attack_tables()
@@ -26,140 +34,166 @@ class MoveGenerator():
         if self._load_magic_tables() == False:
                 print("Unable to load magic tables, press enter to generate now...")
                 self._generate_magic_tables()
+        self._build_slider_lookup()
+        self._generate_line_tables()
+
+    def publish_tables(self)->SharedTables:
+        '''Copies the tables into shared memory, pass its name to MoveGenerator in other processes
+
+        The caller owns the block and should close and unlink it once the other processes are done with it.'''
+        return SharedTables.publish(self)
+
+    #The slider and line tables are used through zero-copy views, the 64 entry tables are copied into lists since
+    #indexing a list is several times faster than ndarray.item and each one is only a few hundred bytes
+    def _attach_shared_tables(self, name:str)->None:
+        self.shared_tables = SharedTables(name)
+        for table_name, table in self.shared_tables.tables.items():
+            if table_name in ('slider_attacks','line_table','between_table'):
+                setattr(self,table_name,table)
+            else:
+                setattr(self,table_name,table.tolist())
 
-    def get_mask_for_square(self, board:Board, square_index:int)->u64:
+    def get_mask_for_square(self, board:Board, square_index:int)->int:
         '''Returns the move mask for the piece on the given square.
         
         Used for external move validation.'''
         piece = bb_utils.get_piece_from_square(board.position,square_index)
-        occ = board.get_occupied()
-        friendly = board.position.color_masks[piece.p_color.value]
-        piece_mask = bb_utils.u64_from_index(square_index)
+        if piece.p_type == PieceType.EMPTY:
+            print("INVALID MOVE, SOURCE SQUARE EMPTY")
+            return 0
         w_to_move = True if piece.p_color == Color.WHITE else False
-        threatened = self._get_threat_mask(board, w_to_move)
-        castle_rights = (board.position.w_k_castle,board.position.w_q_castle) if w_to_move else (board.position.b_k_castle,board.position.b_q_castle)
-        pinned = u64(0)
-        mask = (0,u64(0))
-        match piece.p_type:
-            case PieceType.EMPTY:
-                print("INVALID MOVE, SOURCE SQUARE EMPTY")
-                return u64(0)
-            case PieceType.PAWN:
-                mask  = self._pawn_moves(piece_mask,occ,friendly,pinned,w_to_move)
-            case PieceType.BISHOP:
-                mask = self._bishop_moves(piece_mask,occ,friendly,pinned)
-            case PieceType.KNIGHT:
-                mask  = self._knight_moves(piece_mask,occ,friendly,pinned)
-            case PieceType.ROOK:
-                mask  = self._rook_moves(piece_mask,occ,friendly,pinned)
-            case PieceType.QUEEN:
-                mask  = self._queen_moves(piece_mask,occ,friendly,pinned)
-            case PieceType.KING:
-                mask  = self._king_moves(piece_mask,threatened,friendly,occ,w_to_move,castle_rights[0],castle_rights[1])
-        return mask[0][1]
+        move_masks = self._generate_move_masks(board, w_to_move)
+        for mask in move_masks[piece.p_type.value-1]:
+            if mask[0] == square_index:
+                return mask[1]
+        return 0
 
     #Generates all encoded valid moves for the given board 
-    def generate_moves(self, board:Board):
-        '''Generates all encoded valid moves for the given board'''
-        w_move = board.position.w_to_move
-        move_masks = self._generate_move_masks(board, w_move)
-        friendly = move_encoding.Color.WHITE if w_move else move_encoding.Color.BLACK
+    #Search leaves annotate off, the check flags cost a make, a check test and possibly a full mate test per move
+    def generate_moves(self, board:Board, annotate:bool = True):
+        '''Generates all encoded valid moves for the given board
+
+        When annotate is False the check flags are left as NONE, annotate_move fills them in for a single move.'''
+        move_masks = self._generate_move_masks(board, board.position.w_to_move)
+        move_codes = self._encode_moves(board,move_masks,BD.FULL)
+        if annotate:
+            move_codes = [self.annotate_move(board,move_code) for move_code in move_codes]
+        return move_codes
+
+    def generate_captures(self, board:Board, move_masks = None):
+        '''Generates the unannotated moves that capture an enemy piece'''
+        if move_masks == None:
+            move_masks = self._generate_move_masks(board, board.position.w_to_move)
+        friendly = board.position.color_masks[Color.WHITE.value] if board.position.w_to_move else board.position.color_masks[Color.BLACK.value]
+        return self._encode_moves(board,move_masks,board.get_occupied()^friendly)
+
+    def generate_quiets(self, board:Board, move_masks = None):
+        '''Generates the unannotated moves to empty squares, including castles'''
+        if move_masks == None:
+            move_masks = self._generate_move_masks(board, board.position.w_to_move)
+        return self._encode_moves(board,move_masks,board.get_empty())
+
+    #Encodes every move in the move masks that lands on the target mask
+    def _encode_moves(self, board:Board, move_masks, target_mask:int):
         move_codes = []
         for i in range(6):
             for mask in move_masks[i]:
-                for move in bb_utils.get_piecewise_bits(mask[1]):
-                    source_type = move_encoding.PieceType(i+1)
-                    source = move_encoding.Piece(friendly,source_type,mask[0])
-                    dest = bb_utils.get_piece_from_square(board.position,move)
-                    move_type = move_encoding.MoveType.CAPTURE if dest.p_type != move_encoding.PieceType.EMPTY else move_encoding.MoveType.QUIET
-                    if source_type == move_encoding.PieceType.PAWN and move_type == move_encoding.MoveType.QUIET:
-                        move_type = move_encoding.MoveType.PAWN_MOVE
-                    check_type = move_encoding.CheckFlags.NONE
-                    special = move_encoding.Special(move_type,check_type)
-                    
-                    #look for check and checkmate
-                    base_move = move_encoding.encode(source,dest,special)
-                    result = board.make_move_copy(base_move)
-                    enemy_in_check = self._get_self_in_check(result)
-                    if enemy_in_check:
-                        new_masks = self._generate_move_masks(result,w_move)
-                        has_valid_move = False
-                        for piece_masks in new_masks:
-                            for single_mask in piece_masks:
-                                if single_mask[1] != 0:
-                                    has_valid_move = True
-                                    break
-                        if has_valid_move:
-                            check_type = move_encoding.CheckFlags.CHECK
-                        else:
-                            check_type = move_encoding.CheckFlags.CHECKMATE
-
-                    #re-encode the move with new check information
-                    special = move_encoding.Special(move_type,check_type)
-
-                    #if self in check after move, don't add this move
-                    result_threats = self._get_threat_mask(result,w_move)
-                    if not self._calc_check(result,result_threats,w_move):
-                        move_codes.append(move_encoding.encode(source,dest,special))
+                for move in bb_utils.get_piecewise_bits(mask[1]&target_mask):
+                    move_codes.append(self._encode_move(board,i+1,mask[0],move))
         return move_codes
 
+    #Encodes one move from the piece type and squares, without check flags
+    def _encode_move(self, board:Board, source_type_value:int, source_index:int, dest_index:int)->u32:
+        friendly = move_encoding.Color.WHITE if board.position.w_to_move else move_encoding.Color.BLACK
+        source_type = move_encoding.PieceType(source_type_value)
+        source = move_encoding.Piece(friendly,source_type,source_index)
+        dest = bb_utils.get_piece_from_square(board.position,dest_index)
+        move_type = move_encoding.MoveType.CAPTURE if dest.p_type != move_encoding.PieceType.EMPTY else move_encoding.MoveType.QUIET
+        if source_type == move_encoding.PieceType.PAWN and move_type == move_encoding.MoveType.QUIET:
+            move_type = move_encoding.MoveType.PAWN_MOVE
+        #the king only moves two squares when castling, towards the h file is king side
+        elif source_type == move_encoding.PieceType.KING and abs(dest_index - source_index) == 2:
+            move_type = move_encoding.MoveType.KING_CASTLE if dest_index < source_index else move_encoding.MoveType.QUEEN_CASTLE
+        special = move_encoding.Special(move_type,move_encoding.CheckFlags.NONE)
+        return move_encoding.encode(source,dest,special)
+
+    #Looks for check and checkmate by playing the move on the board and taking it back
+    def annotate_move(self, board:Board, move_code:u32)->u32:
+        '''Returns the move code re-encoded with its check or checkmate flag'''
+        board.make_move(move_code)
+        check_type = move_encoding.CheckFlags.NONE
+        if self._get_self_in_check(board):
+            if self._has_legal_move(board,board.position.w_to_move):
+                check_type = move_encoding.CheckFlags.CHECK
+            else:
+                check_type = move_encoding.CheckFlags.CHECKMATE
+        board.unmake_move()
+        decoded = move_encoding.decode_move(move_code)
+        special = move_encoding.Special(decoded.info.move_type,check_type)
+        return move_encoding.encode(decoded.source,decoded.destination,special)
+
+    #tells you if the given side has at least one legal move
+    def _has_legal_move(self, board:Board, w_to_move:bool)->bool:
+        for piece_masks in self._generate_move_masks(board,w_to_move):
+            for single_mask in piece_masks:
+                if single_mask[1] != 0:
+                    return True
+        return False
+
     def _generate_basic_attack_tables(self):
         self._generate_pawn_attack_tables()
         self._generate_knight_attack_table()
         self._generate_king_attack_table()
 
+    #The rook and bishop magic tables share one memory mapped uint64 array, lookups read it with item to get Python ints
     def _load_magic_tables(self):
-        try:
-            with open("tables\\rook_magic_tables.csv",'r') as f:
-                reader = csv.reader(f)
-                self.rook_magic_table = [[u64(num) for num in row] for row in reader]
-            with open("tables\\bishop_magic_tables.csv",'r') as f:
-                reader = csv.reader(f)
-                self.bishop_magic_table = [[u64(num) for num in row] for row in reader]
-
-            print("Magic tables loaded successfully.")
-        except IOError:
+        self.slider_attacks = table_files.load_table(table_files.SLIDER_TABLE)
+        if self.slider_attacks is None:
             print("Failed to find magic table files.")
+            return False
+        if len(self.slider_attacks) != table_files.slider_offsets(self.rook_blocker_table,self.bishop_blocker_table)[2]:
+            print("Magic table size does not match the blocker tables.")
+            return False
+        print("Magic tables loaded successfully.")
+        return True
 
     def _load_slider_attack_tables(self):
-        try:
-            with open("tables\\rook_attack_table.txt",'r') as f:
-                self.rook_attack_table = np.fromstring(f.read(),u64,sep='\n')
-            with open("tables\\bishop_attack_table.txt",'r') as f:
-                self.bishop_attack_table = np.fromstring(f.read(),u64,sep='\n')
-        except IOError:
+        rook_table = table_files.load_table('rook_attack_table')
+        bishop_table = table_files.load_table('bishop_attack_table')
+        if rook_table is None or bishop_table is None:
             print("You need to generate the attack tables before the first run.")
             print("run 'generate_lookup_tables.py', then try again.")
             sys.exit()
+        self.rook_attack_table = rook_table.tolist()
+        self.bishop_attack_table = bishop_table.tolist()
 
     def _load_blocker_tables(self):
-        try:
-            with open("tables\\rook_blockers_table.txt",'r') as f:
-                self.rook_blocker_table = np.fromstring(f.read(),u64,sep='\n')
-            with open("tables\\bishop_blockers_table.txt",'r') as f:
-                self.bishop_blocker_table = np.fromstring(f.read(),u64,sep='\n')
-        except IOError:
+        rook_table = table_files.load_table('rook_blockers_table')
+        bishop_table = table_files.load_table('bishop_blockers_table')
+        if rook_table is None or bishop_table is None:
             print("You need to generate the blocker tables before the first run.")
             print("run 'generate_lookup_tables.py', then try again.")
             sys.exit()
+        self.rook_blocker_table = rook_table.tolist()
+        self.bishop_blocker_table = bishop_table.tolist()
 
     #Pawn Attacks
-    def w_pawn_attacks_east(self, w_pawns:u64):
+    def w_pawn_attacks_east(self, w_pawns:int):
         return bb_utils.move(w_pawns,DIR.NE)
     
-    def w_pawn_attacks_west(self, w_pawns:u64):
+    def w_pawn_attacks_west(self, w_pawns:int):
         return bb_utils.move(w_pawns, DIR.NW)
     
-    def w_pawn_attacks_any(self, w_pawns:u64):
+    def w_pawn_attacks_any(self, w_pawns:int):
         return self.w_pawn_attacks_east(w_pawns) | self.w_pawn_attacks_west(w_pawns)
     
-    def b_pawn_attacks_east(self, b_pawns:u64):
+    def b_pawn_attacks_east(self, b_pawns:int):
         return bb_utils.move(b_pawns,DIR.SE)
     
-    def b_pawn_attacks_west(self, b_pawns:u64):
+    def b_pawn_attacks_west(self, b_pawns:int):
         return bb_utils.move(b_pawns, DIR.SW)
     
-    def b_pawn_attacks_any(self, b_pawns:u64):
+    def b_pawn_attacks_any(self, b_pawns:int):
         return self.b_pawn_attacks_east(b_pawns) | self.b_pawn_attacks_west(b_pawns)
 
     #Pawn Captures
@@ -188,67 +222,49 @@ class MoveGenerator():
     #Knight Attacks
     def _knight_attacks(self, knights):
         #Prevents wrapping around sides of board
-        not_a = ~BD.FILE_A
-        not_ab = ~(BD.FILE_A | BD.FILE_B)
-        not_h = ~BD.FILE_H
-        not_gh = ~(BD.FILE_H | BD.FILE_G)
-
-        nnw = u64(DIR.NW.value + DIR.N.value)
-        nne = u64(DIR.NE.value + DIR.N.value)
-        wnw = u64(DIR.W.value + DIR.NW.value)
-        ene = u64(DIR.E.value + DIR.NE.value)
+        not_a = BD.FULL ^ BD.FILE_A
+        not_ab = BD.FULL ^ (BD.FILE_A | BD.FILE_B)
+        not_h = BD.FULL ^ BD.FILE_H
+        not_gh = BD.FULL ^ (BD.FILE_H | BD.FILE_G)
+
+        nnw = DIR.NW.value + DIR.N.value
+        nne = DIR.NE.value + DIR.N.value
+        wnw = DIR.W.value + DIR.NW.value
+        ene = DIR.E.value + DIR.NE.value
         attacks = ((knights << -nnw)&not_h) | ((knights << -nne)&not_a) | ((knights << -wnw)&not_gh) | ((knights << -ene)&not_ab)
 
-        ssw = u64(DIR.SW.value + DIR.S.value)
-        sse = u64(DIR.SE.value + DIR.S.value)
-        wsw = u64(DIR.W.value + DIR.SW.value)
-        ese = u64(DIR.E.value + DIR.SE.value)
+        ssw = DIR.SW.value + DIR.S.value
+        sse = DIR.SE.value + DIR.S.value
+        wsw = DIR.W.value + DIR.SW.value
+        ese = DIR.E.value + DIR.SE.value
         attacks |=  ((knights >> ssw)&not_h) | ((knights >> sse)&not_a) | ((knights >> wsw)&not_gh) | ((knights >> ese)&not_ab)
 
         return attacks
     
-    def _king_attacks(self,king: u64):
+    def _king_attacks(self,king: int):
         attacks = bb_utils.move(king,DIR.N) | bb_utils.move(king,DIR.NE) | bb_utils.move(king,DIR.E) | bb_utils.move(king,DIR.SE)
         attacks |= bb_utils.move(king,DIR.S) | bb_utils.move(king,DIR.SW) | bb_utils.move(king,DIR.W) | bb_utils.move(king,DIR.NW)
         return attacks
     
     #Sliding pieces
-    def _bishop_attacks(self,bishop: u64):
-        bishop_index = []
-        res = 0
-        while res != None:
-            res = bb_utils.bitscan_fwd(bishop)
-            if res != None:
-                bishop_index.append(res)
-                bishop -= u64(1)<<u64(res)
+    def _bishop_attacks(self,bishop: int):
+        bishop_index = bb_utils.get_piecewise_bits(bishop)
         attacks = []
         for b in bishop_index:
             attacks.append(self.bishop_attack_table[b])
 
         return attacks
 
-    def _rook_attacks(self,rook: u64):
-        rook_index = []
-        res = 0
-        while res != None:
-            res = bb_utils.bitscan_fwd(rook)
-            if res != None:
-                rook_index.append(res)
-                rook -= u64(1)<<u64(res)
+    def _rook_attacks(self,rook: int):
+        rook_index = bb_utils.get_piecewise_bits(rook)
         attacks = []
         for r in rook_index:
             attacks.append(self.rook_attack_table[r])
 
         return attacks
 
-    def _queen_attacks(self,queen: u64):
-        queen_index = []
-        res = 0
-        while res != None:
-            res = bb_utils.bitscan_fwd(queen)
-            if res != None:
-                queen_index.append(res)
-                queen -= u64(1)<<u64(res)
+    def _queen_attacks(self,queen: int):
+        queen_index = bb_utils.get_piecewise_bits(queen)
         attacks = []
         for q in queen_index:
             attacks.append(self.bishop_attack_table[q] | self.rook_attack_table[q])
@@ -256,121 +272,96 @@ class MoveGenerator():
         return attacks
     
     def _load_magic_numbers(self):
-        try:
-            with open("tables\\rook_magic_numbers.txt",'r') as f:
-                self.rook_magics = np.fromstring(f.read(),u64,sep='\n')
-            with open("tables\\bishop_magic_numbers.txt",'r') as f:
-                self.bishop_magics = np.fromstring(f.read(),u64,sep='\n')
-            
-        except IOError:
+        rook_magics = table_files.load_table('rook_magic_numbers')
+        bishop_magics = table_files.load_table('bishop_magic_numbers')
+        if rook_magics is None or bishop_magics is None:
             print("You're missing the magic numbers, please generate some and try again")
             sys.exit()
+        self.rook_magics = rook_magics.tolist()
+        self.bishop_magics = bishop_magics.tolist()
 
     def _generate_pawn_attack_tables(self):
-        self.w_pawn_attack_table = np.zeros(64,u64)
-        self.b_pawn_attack_table = np.zeros(64,u64)
+        self.w_pawn_attack_table = [0]*64
+        self.b_pawn_attack_table = [0]*64
         for square in range(64):
             sq_mask = bb_utils.u64_from_index(square)
             self.w_pawn_attack_table[square] = self.w_pawn_attacks_any(sq_mask)
             self.b_pawn_attack_table[square] = self.b_pawn_attacks_any(sq_mask)
 
     def _generate_knight_attack_table(self):
-        self.knight_attack_table = np.zeros(64,u64)
+        self.knight_attack_table = [0]*64
         for square in range(64):
             sq_mask = bb_utils.u64_from_index(square)
             self.knight_attack_table[square] = self._knight_attacks(sq_mask)
 
+    #Lines and segments between aligned squares, used to keep pinned pieces on their pin and to block checks
+    #Stored as (64, 64) uint64 arrays like the shared memory views, read with item to get Python ints
+    def _generate_line_tables(self):
+        line_table = [[0]*64 for square in range(64)]
+        between_table = [[0]*64 for square in range(64)]
+        for a in range(64):
+            a_mask = bb_utils.u64_from_index(a)
+            for calc_moves in (bb_utils.calc_rook_moves, bb_utils.calc_bishop_moves):
+                empty_rays = calc_moves(a,0)
+                for b in bb_utils.get_piecewise_bits(empty_rays):
+                    b_mask = bb_utils.u64_from_index(b)
+                    line_table[a][b] = (empty_rays & calc_moves(b,0)) | a_mask | b_mask
+                    between_table[a][b] = calc_moves(a,b_mask) & calc_moves(b,a_mask)
+        self.line_table = np.array(line_table, np.uint64)
+        self.between_table = np.array(between_table, np.uint64)
+
     def _generate_king_attack_table(self):
-        self.king_attack_table = np.zeros(64,u64)
+        self.king_attack_table = [0]*64
         for square in range(64):
             sq_mask = bb_utils.u64_from_index(square)
             self.king_attack_table[square] = self._king_attacks(sq_mask)
 
-    def _generate_rook_magic_table(self):
-        print("Generating rook magic table...")
-        for square in range(64):
-            mask = self.rook_blocker_table[square]
-            mask_pop_count = bb_utils.pop_count(mask)
-            for i in range(1 << mask_pop_count):
-                #start filling the table with calculated moves
-                combo_mask = bb_utils.generate_blocker_combo_from_index(i,mask)
-                #manually calculate rook moves for this situation
-                moves = bb_utils.calc_rook_moves(square,combo_mask)
-                #obtain the magic index
-                magic_index = self._calc_magic_index(combo_mask,self.rook_magics[square],mask_pop_count)
-                #fill the appropriate table slot with the valid moves
-                if self.rook_magic_table[square][magic_index] == 0:
-                    self.rook_magic_table[square][magic_index] = moves
-                else:
-                    print("SOMETHING WENT WRONG, INVALID MAGIC TABLE")
-
-    def _generate_bishop_magic_table(self):
-        print("Generating bishop magic table...")
-        for square in range(64):
-            mask = self.bishop_blocker_table[square]
-            mask_pop_count = bb_utils.pop_count(mask)
-            for i in range(1 << mask_pop_count):
-                #start filling the table with calculated moves
-                combo_mask = bb_utils.generate_blocker_combo_from_index(i,mask)
-                #manually calculate bishop moves for this situation
-                moves = bb_utils.calc_bishop_moves(square,combo_mask)
-                #obtain the magic index
-                magic_index = self._calc_magic_index(combo_mask,self.bishop_magics[square],mask_pop_count)
-                #fill the appropriate table slot with the valid moves
-                if self.bishop_magic_table[square][magic_index] == 0:
-                    self.bishop_magic_table[square][magic_index] = moves
-                else:
-                    print("SOMETHING WENT WRONG, INVALID MAGIC TABLE")
-
     def _generate_magic_tables(self):
-        #creates two arrays to hold the tables, rook tables need 4096 combos, bishops need 512
-        #one spot for every possible combination of blocker pieces relevant to the given square
+        #creates one array to hold both tables, every square gets a spot for each combination of the blocker pieces
+        #relevant to it, up to 4096 for rooks and 512 for bishops
+        print("Generating magic tables...")
         self._load_magic_numbers()
-        self.rook_magic_table = np.zeros((64,4096),u64)
-        self.bishop_magic_table = np.zeros((64,4096),u64)
-
-        self._generate_rook_magic_table()
-        self._generate_bishop_magic_table()
+        table = magic_generator.build_slider_table(self.rook_magics,self.bishop_magics)
         
-        self._save_magic_tables_to_file()
+        self._save_magic_tables_to_file(table)
+        self._load_magic_tables()
         print("Done!")
 
     #Performs the transformation on the blockermask to get the magic index
-    def _calc_magic_index(self, mask: u64, magic_number: u64, blocker_count: int):
-        #overflow is expected when calculating hash values
-        with warnings.catch_warnings():
-            warnings.filterwarnings('ignore',r'overflow encountered in ulonglong_scalars')
-            result = mask * magic_number
-        shift = u64(64 - blocker_count)
-        return result >> shift
-
-    def _save_magic_tables_to_file(self):
-        with open("tables\\rook_magic_tables.csv",'w+',newline='') as f:
-            magic_writer = csv.writer(f)
-            for i, list in enumerate(self.rook_magic_table):
-                line = [num for j,num in enumerate(self.rook_magic_table[i])]
-                magic_writer.writerow(line)
-        with open("tables\\bishop_magic_tables.csv",'w+',newline='') as f:
-            magic_writer = csv.writer(f)
-            for i, list in enumerate(self.bishop_magic_table):
-                line = [num for j,num in enumerate(self.bishop_magic_table[i])]
-                magic_writer.writerow(line)
-
-    def _lookup_rook_moves(self, occupied: u64, square_index):
-        magic = self.rook_magics[square_index]
-        mask = self.rook_blocker_table[square_index]
-        sub_mask = mask&occupied
-        magic_index = self._calc_magic_index(sub_mask,magic,bb_utils.pop_count(mask))
-        return self.rook_magic_table[square_index][magic_index]
-    
-    def _lookup_bishop_moves(self, occupied: u64, square_index):
-        magic = self.bishop_magics[square_index]
-        mask = self.bishop_blocker_table[square_index]
-        sub_mask = mask&occupied
-        magic_index = self._calc_magic_index(sub_mask,magic,bb_utils.pop_count(mask))
-        return self.bishop_magic_table[square_index][magic_index]
-
-    def _slider_moves(self, piece_mask: u64, occ_mask: u64,friendly_mask: u64, isRook: bool):
+    def _calc_magic_index(self, mask: int, magic_number: int, blocker_count: int):
+        #overflow is expected when calculating hash values, the product is truncated to 64 bits
+        result = (mask * magic_number) & BD.FULL
+        return result >> (64 - blocker_count)
+
+    def _save_magic_tables_to_file(self, table):
+        table_files.save_table(table_files.SLIDER_TABLE,table)
+
+    #Everything a slider lookup needs per square is worked out once: the blocker mask, the magic number, the shift
+    #that leaves the index bits and the offset of the square's entries in the slider attack table
+    def _build_slider_lookup(self):
+        self.rook_masks = self.rook_blocker_table
+        self.bishop_masks = self.bishop_blocker_table
+        self.rook_shifts = [64 - bb_utils.pop_count(mask) for mask in self.rook_masks]
+        self.bishop_shifts = [64 - bb_utils.pop_count(mask) for mask in self.bishop_masks]
+        self.rook_offsets, self.bishop_offsets, size = table_files.slider_offsets(self.rook_masks,self.bishop_masks)
+
+    def get_table_memory(self)->dict:
+        '''Returns the size of the slider attack table next to the 64 x 4096 per piece layout it replaced'''
+        return table_files.slider_memory_report(self.rook_masks,self.bishop_masks)
+
+    #The product is truncated to 64 bits by the mask, the shift keeps the top bits as the index
+    def _lookup_rook_moves(self, occupied: int, square_index: int)->int:
+        return self.slider_attacks.item(self.rook_offsets[square_index]
+            + ((((occupied & self.rook_masks[square_index]) * self.rook_magics[square_index]) & BD.FULL) >> self.rook_shifts[square_index]))
+
+    def _lookup_bishop_moves(self, occupied: int, square_index: int)->int:
+        return self.slider_attacks.item(self.bishop_offsets[square_index]
+            + ((((occupied & self.bishop_masks[square_index]) * self.bishop_magics[square_index]) & BD.FULL) >> self.bishop_shifts[square_index]))
+
+    def _lookup_queen_moves(self, occupied: int, square_index: int)->int:
+        return self._lookup_rook_moves(occupied,square_index) | self._lookup_bishop_moves(occupied,square_index)
+
+    def _slider_moves(self, piece_mask: int, occ_mask: int,friendly_mask: int, isRook: bool):
         #find all the rook index for the given side
         pieces = bb_utils.get_piecewise_bits(piece_mask)
         #for each rook, lookup the valid moves
@@ -382,119 +373,167 @@ class MoveGenerator():
         #return list of movesets
         return move_list
 
-    def _queen_moves(self, queen_mask: u64, occ_mask: u64, friendly_mask: u64, pinned:u64):
+    def _queen_moves(self, queen_mask: int, occ_mask: int, friendly_mask: int, pinned:int):
         #find all the queen index for the given side
         queens = bb_utils.get_piecewise_bits(queen_mask)
         #for each queen, lookup the valid moves
         move_list = []
         for queen_index in queens:
             #Combine rook moves and bishop moves
-            queen_moves = (self._lookup_rook_moves(occ_mask,queen_index)|self._lookup_bishop_moves(occ_mask,queen_index))&~friendly_mask
+            queen_moves = self._lookup_queen_moves(occ_mask,queen_index)&~friendly_mask
             move_list.append((queen_index,queen_moves))
         #return list of movesets
         return move_list
     
     #returns bitboard of all pieces that can be 'seen' by the piece
-    def _get_attack_targets(self, enemy_mask: u64, moves_mask: u64):
+    def _get_attack_targets(self, enemy_mask: int, moves_mask: int):
         captures = moves_mask & enemy_mask
         return captures
     
     #finds captures, removes them, then recalculates attacks and returns only squares seen past the blockers
-    def _x_ray_attacks(self, square_index, occ_mask: u64, blocker_mask: u64, isRook: bool):
+    def _x_ray_attacks(self, square_index, occ_mask: int, blocker_mask: int, isRook: bool):
         moves = self._lookup_rook_moves(occ_mask,square_index) if isRook else self._lookup_bishop_moves(occ_mask,square_index)
         targets = self._get_attack_targets(blocker_mask, moves)
         new_moves = self._lookup_rook_moves(occ_mask^targets, square_index) if isRook else self._lookup_bishop_moves(occ_mask^targets, square_index)
         return moves ^ new_moves
     
-    #returns a mask of valid moves for each type and piece for the given side
+    #returns a mask of legal moves for each type and piece for the given side
     def _generate_move_masks(self,board: Board, w_to_move: bool):
         move_list = []
         occupied = board.position.color_masks[Color.WHITE.value]|board.position.color_masks[Color.BLACK.value]
         friendly = board.position.color_masks[Color.WHITE.value] if w_to_move else board.position.color_masks[Color.BLACK.value]
         castle_rights = (board.position.w_k_castle,board.position.w_q_castle) if w_to_move else (board.position.b_k_castle,board.position.b_q_castle)
-        #TODO
-        pinned = u64(0)
+        king = board.position.piece_masks[PieceType.KING.value]&friendly
+        #pins are applied to the pseudo-legal masks once every piece has been generated
+        pinned = 0
         #all squares attacked by enemy pieces(including protected pieces)
-        threat_mask = self._get_threat_mask(board,w_to_move)
+        #sliders see through the king so it can't step back along the line of a check
+        threat_mask = self._get_threat_mask(board,w_to_move,king)
         #for piece, each is responsible for checking if move is legal
         move_list.append(self._pawn_moves(board.position.piece_masks[PieceType.PAWN.value]&friendly,occupied,friendly,pinned,w_to_move))
         move_list.append(self._knight_moves(board.position.piece_masks[PieceType.KNIGHT.value]&friendly,occupied,friendly,pinned))
         move_list.append(self._bishop_moves(board.position.piece_masks[PieceType.BISHOP.value]&friendly,occupied,friendly,pinned))
         move_list.append(self._rook_moves(board.position.piece_masks[PieceType.ROOK.value]&friendly,occupied,friendly,pinned))
         move_list.append(self._queen_moves(board.position.piece_masks[PieceType.QUEEN.value]&friendly,occupied,friendly,pinned))
-        move_list.append(self._king_moves(board.position.piece_masks[PieceType.KING.value]&friendly,threat_mask,friendly,occupied,w_to_move,castle_rights[0],castle_rights[1]))
+        move_list.append(self._king_moves(king,threat_mask,friendly,occupied,w_to_move,castle_rights[0],castle_rights[1]))
 
+        king_square = bb_utils.bitscan_fwd(king)
+        if king_square != 64:
+            self._restrict_to_legal(board,move_list,king_square,occupied,friendly,w_to_move)
         return move_list
 
-    #returns one mask of all squares the enemy can attack currently
-    def _get_threat_mask(self,board:Board,w_to_move:bool)->u64:
-        occupied = board.position.color_masks[Color.WHITE.value]|board.position.color_masks[Color.BLACK.value]
-        friendly = board.position.color_masks[Color.BLACK.value] if w_to_move else board.position.color_masks[Color.WHITE.value]
-        pinned = u64(0)
-        threat_mask = u64(0)
-        moves = [(0,u64(0))]
-        moves = moves + self._pawn_capture_mask(board.position.piece_masks[PieceType.PAWN.value]&friendly,occupied,friendly,pinned,(not w_to_move))
-        moves = moves + self._knight_moves(board.position.piece_masks[PieceType.KNIGHT.value]&friendly,occupied,friendly,pinned)
-        moves = moves + self._bishop_moves(board.position.piece_masks[PieceType.BISHOP.value]&friendly,occupied,friendly,pinned)
-        moves = moves + self._rook_moves(board.position.piece_masks[PieceType.ROOK.value]&friendly,occupied,friendly,pinned)
-        moves = moves + self._queen_moves(board.position.piece_masks[PieceType.QUEEN.value]&friendly,occupied,friendly,pinned)
-        moves = moves + self._king_attack_mask(board.position.piece_masks[PieceType.KING.value]&friendly,threat_mask,friendly)
+    #Removes moves that would leave the king in check from the non-king move masks
+    #With one checker every move has to capture or block it, with two only the king can move,
+    #and pinned pieces are kept on the line between their king and the pinning piece
+    def _restrict_to_legal(self, board:Board, move_list, king_square:int, occupied:int, friendly:int, w_to_move:bool)->None:
+        piece_masks = board.position.piece_masks
+        enemy = occupied ^ friendly
+        checkers = self._attackers_to(board,king_square,occupied,enemy,w_to_move)
+        check_count = bb_utils.pop_count(checkers)
+        if check_count == 0:
+            check_mask = BD.FULL
+        elif check_count == 1:
+            check_mask = checkers | self.between_table.item(king_square,bb_utils.bitscan_fwd(checkers))
+        else:
+            check_mask = 0
+        enemy_rook_queen = (piece_masks[PieceType.ROOK.value]|piece_masks[PieceType.QUEEN.value]) & enemy
+        enemy_bishop_queen = (piece_masks[PieceType.BISHOP.value]|piece_masks[PieceType.QUEEN.value]) & enemy
+        pinned = self._absolute_pins(king_square,occupied,friendly,enemy_rook_queen,enemy_bishop_queen)
+        if check_mask == BD.FULL and pinned == 0:
+            return
+        line_table = self.line_table
+        for piece_index in range(5):
+            restricted = []
+            for square, moves in move_list[piece_index]:
+                moves &= check_mask
+                if pinned & (1 << square):
+                    moves &= line_table.item(king_square,square)
+                restricted.append((square,moves))
+            move_list[piece_index] = restricted
+
+    #returns the enemy pieces that attack the given square
+    def _attackers_to(self, board:Board, square_index:int, occupied:int, enemy:int, w_to_move:bool)->int:
+        piece_masks = board.position.piece_masks
+        #a pawn of the defending color on the square attacks exactly the squares enemy pawns attack it from
+        pawn_table = self.w_pawn_attack_table if w_to_move else self.b_pawn_attack_table
+        attackers = pawn_table[square_index] & piece_masks[PieceType.PAWN.value]
+        attackers |= self.knight_attack_table[square_index] & piece_masks[PieceType.KNIGHT.value]
+        attackers |= self._lookup_rook_moves(occupied,square_index) & (piece_masks[PieceType.ROOK.value]|piece_masks[PieceType.QUEEN.value])
+        attackers |= self._lookup_bishop_moves(occupied,square_index) & (piece_masks[PieceType.BISHOP.value]|piece_masks[PieceType.QUEEN.value])
+        return attackers & enemy
+
+    #returns one mask of all squares the enemy can attack currently, including squares holding their own pieces
+    #pieces in the transparent mask do not block enemy sliders
+    def _get_threat_mask(self,board:Board,w_to_move:bool,transparent:int = 0)->int:
+        occupied = (board.position.color_masks[Color.WHITE.value]|board.position.color_masks[Color.BLACK.value]) & ~transparent
+        enemy = board.position.color_masks[Color.BLACK.value] if w_to_move else board.position.color_masks[Color.WHITE.value]
+        pinned = 0
+        enemy_pawns = board.position.piece_masks[PieceType.PAWN.value]&enemy
+        #pawns attack diagonally whether or not a piece is there to capture
+        threat_mask = self.b_pawn_attacks_any(enemy_pawns) if w_to_move else self.w_pawn_attacks_any(enemy_pawns)
+        #nothing is filtered out as friendly so protected pieces are marked as attacked too
+        moves = [(0,0)]
+        moves = moves + self._knight_moves(board.position.piece_masks[PieceType.KNIGHT.value]&enemy,occupied,0,pinned)
+        moves = moves + self._bishop_moves(board.position.piece_masks[PieceType.BISHOP.value]&enemy,occupied,0,pinned)
+        moves = moves + self._rook_moves(board.position.piece_masks[PieceType.ROOK.value]&enemy,occupied,0,pinned)
+        moves = moves + self._queen_moves(board.position.piece_masks[PieceType.QUEEN.value]&enemy,occupied,0,pinned)
+        moves = moves + self._king_attack_mask(board.position.piece_masks[PieceType.KING.value]&enemy,0,0)
         for mask in moves:
             threat_mask |= mask[1]
         return threat_mask
 
     #moves and captures
-    def _pawn_moves(self, pawns: u64, occ: u64, friendly: u64, pinned: u64, w_to_move: bool, en_passant_target = 64):
+    def _pawn_moves(self, pawns: int, occ: int, friendly: int, pinned: int, w_to_move: bool, en_passant_target = 64):
         if pinned == 0:
             return self._calc_each_pawn_moves(pawns,occ,friendly,w_to_move,en_passant_target)
 
-    def _pawn_capture_mask(self, pawns:u64, occ:u64, friendly:u64, pinned:u64, w_to_move:bool):
+    def _pawn_capture_mask(self, pawns:int, occ:int, friendly:int, pinned:int, w_to_move:bool):
         pawn_index = bb_utils.get_piecewise_bits(pawns)
         move_set = []
         for index in pawn_index:
-            moves = u64(0)
+            moves = 0
             moves |= self._pawn_captures(index,occ^friendly,w_to_move)
             move_set.append((index,moves))
         return move_set
     
-    def _knight_moves(self, knights:u64, occ:u64, friendly:u64, pinned:u64):
+    def _knight_moves(self, knights:int, occ:int, friendly:int, pinned:int):
         moves = []
         if pinned == 0:
             for piece in bb_utils.get_piecewise_bits(knights):
                 moves.append((piece,self.knight_attack_table[piece]&~friendly))
         return moves
 
-    def _bishop_moves(self, bishops: u64, occ: u64, friendly: u64, pinned: u64):
+    def _bishop_moves(self, bishops: int, occ: int, friendly: int, pinned: int):
         if pinned == 0:
            return self._slider_moves(bishops,occ,friendly,False)
 
-    def _rook_moves(self, rooks: u64, occ: u64, friendly: u64, pinned: u64):
+    def _rook_moves(self, rooks: int, occ: int, friendly: int, pinned: int):
         if pinned == 0:
             return self._slider_moves(rooks,occ,friendly,True)
 
-    def _king_moves(self, king: u64, threatened:u64, friendly: u64, occ:u64, w_to_move:bool, king_castle:bool, queen_castle:bool):
+    def _king_moves(self, king: int, threatened:int, friendly: int, occ:int, w_to_move:bool, king_castle:bool, queen_castle:bool):
         #return kings moves that are not occupied by friendly pieces, and that are not squares under attack
 
-        castle_mask = u64(0)
+        castle_mask = 0
         if king_castle:
             # white to move, path not occupied, and not under threat
             if w_to_move:
                 if occ&BD.W_KING_CASTLE_MASK == 0:
-                    if (BD.W_KING_CASTLE_MASK|king)&threatened == 0:
+                    if (BD.W_KING_CASTLE_PATH|king)&threatened == 0:
                         castle_mask |= BD.W_KING_CASTLE_SQUARE
-            elif not w_to_move and occ&BD.B_KING_CASTLE_MASK == 0 and (BD.B_KING_CASTLE_MASK|king)&threatened == 0:
+            elif not w_to_move and occ&BD.B_KING_CASTLE_MASK == 0 and (BD.B_KING_CASTLE_PATH|king)&threatened == 0:
                 castle_mask |= BD.B_KING_CASTLE_SQUARE
         if queen_castle:
-            if w_to_move and occ&BD.W_QUEEN_CASTLE_MASK == 0 and (BD.W_QUEEN_CASTLE_MASK|king)&threatened == 0:
+            if w_to_move and occ&BD.W_QUEEN_CASTLE_MASK == 0 and (BD.W_QUEEN_CASTLE_PATH|king)&threatened == 0:
                 castle_mask |= BD.W_QUEEN_CASTLE_SQUARE
-            elif not w_to_move and occ&BD.B_QUEEN_CASTLE_MASK == 0 and (BD.B_QUEEN_CASTLE_MASK|king)&threatened == 0:
+            elif not w_to_move and occ&BD.B_QUEEN_CASTLE_MASK == 0 and (BD.B_QUEEN_CASTLE_PATH|king)&threatened == 0:
                 castle_mask |= BD.B_QUEEN_CASTLE_SQUARE
 
         moves_list = self._king_attack_mask(king,threatened,friendly)
         moves_list = [(move[0], move[1]|castle_mask) for move in moves_list]
         return moves_list
     
-    def _king_attack_mask(self, king: u64, threatened:u64, friendly: u64):
+    def _king_attack_mask(self, king: int, threatened:int, friendly: int):
         moves_list = []
         index = bb_utils.bitscan_fwd(king)
         moves = self.king_attack_table[index]
@@ -502,11 +541,11 @@ class MoveGenerator():
         moves_list.append((index,safe_moves))
         return moves_list
 
-    def _calc_each_pawn_moves(self, pawns:u64, occ:u64, friendly:u64, w_to_move:bool, ep_target_square = 64):
+    def _calc_each_pawn_moves(self, pawns:int, occ:int, friendly:int, w_to_move:bool, ep_target_square = 64):
         pawn_index = bb_utils.get_piecewise_bits(pawns)
         move_set = []
         for index in pawn_index:
-            moves = u64(0)
+            moves = 0
             moves |= self._pawn_single_push(index,occ,w_to_move)
             moves |= self._pawn_double_push(index,occ,w_to_move)
             moves |= self._pawn_captures(index,occ^friendly,w_to_move)
@@ -515,10 +554,10 @@ class MoveGenerator():
             move_set.append((index,moves))
         return move_set
     
-    def _pawn_en_passant(self,square_index:int,occ:u64,w_to_move:bool, ep_target_index:int)->u64:
+    def _pawn_en_passant(self,square_index:int,occ:int,w_to_move:bool, ep_target_index:int)->int:
         w_valid = (w_to_move and int(square_index/8) == 4 and int(ep_target_index/8) == 5)
         b_valid = (not w_to_move and int(square_index/8) == 3 and int(ep_target_index/8) == 2)
-        captures = u64(0)
+        captures = 0
         if w_valid or b_valid:
             piece = bb_utils.u64_from_index(square_index)
             directions = [DIR.NE,DIR.NW] if w_to_move else [DIR.SE, DIR.SW]
@@ -526,36 +565,35 @@ class MoveGenerator():
         ep_mask = bb_utils.u64_from_index(ep_target_index)
         return captures & ep_mask
 
-    def _pawn_captures(self, square_index:int, enemy:u64, w_to_move:bool)->u64:
+    def _pawn_captures(self, square_index:int, enemy:int, w_to_move:bool)->int:
         piece = bb_utils.u64_from_index(square_index)
         directions = [DIR.NE,DIR.NW] if w_to_move else [DIR.SE, DIR.SW]
         captures = bb_utils.move(piece,directions[0]) | bb_utils.move(piece,directions[1])
         return captures&enemy
 
-    def _pawn_single_push(self, square_index:int, occ:u64, w_to_move:bool)->u64:
+    def _pawn_single_push(self, square_index:int, occ:int, w_to_move:bool)->int:
         piece = bb_utils.u64_from_index(square_index)
         direction = DIR.N if w_to_move else DIR.S
         return bb_utils.move(piece,direction)&~occ
     
-    def _pawn_double_push(self, square_index:int, occ:u64, w_to_move:bool)->u64:
+    def _pawn_double_push(self, square_index:int, occ:int, w_to_move:bool)->int:
         piece = bb_utils.u64_from_index(square_index)
         starting_mask = BD.RANK_2 if w_to_move else BD.RANK_7
         if starting_mask & piece == 0:
-            return u64(0)
+            return 0
         else:
-            result = self._pawn_single_push(square_index,occ,w_to_move)
-            new_index = bb_utils.bitscan_fwd(result)
-            if new_index != None:
-                return self._pawn_single_push(new_index,occ,w_to_move)
-            else:
-                return u64(0)
+            single = self._pawn_single_push(square_index,occ,w_to_move)
+            #a blocked single push also blocks the double push, bitscan_fwd(0) is 64 and not a square
+            if single == 0:
+                return 0
+            return self._pawn_single_push(bb_utils.bitscan_fwd(single),occ,w_to_move)
 
     #tells you if the given square is under attack by the given threat mask
-    def _is_square_attacked(self,square_index:int,threat_mask:Position)->bool:
+    def _is_square_attacked(self,square_index:int,threat_mask:int)->bool:
         return bb_utils.u64_from_index(square_index) & threat_mask != 0
 
     #tells you if the given side is in check currently
-    def _calc_check(self,board:Board, threat_mask:u64, w_to_move:bool):
+    def _calc_check(self,board:Board, threat_mask:int, w_to_move:bool):
         king_mask = board.position.color_masks[Color.WHITE.value] if w_to_move else board.position.color_masks[Color.BLACK.value]
         king_mask &= board.position.piece_masks[PieceType.KING.value]
         king_square = bb_utils.bitscan_fwd(king_mask)
@@ -563,13 +601,19 @@ class MoveGenerator():
     
     def _get_self_in_check(self,board:Board)->bool:
         '''Tells you if the current side is in check.'''
-        threat_mask = self._get_threat_mask(board,board.position.w_to_move)
-        return self._calc_check(board,threat_mask,board.position.w_to_move)
+        w_to_move = board.position.w_to_move
+        occupied = board.position.color_masks[Color.WHITE.value]|board.position.color_masks[Color.BLACK.value]
+        friendly = board.position.color_masks[Color.WHITE.value] if w_to_move else board.position.color_masks[Color.BLACK.value]
+        king_square = bb_utils.bitscan_fwd(board.position.piece_masks[PieceType.KING.value]&friendly)
+        if king_square == 64:
+            return False
+        #only the pieces attacking the king matter, so the full threat mask is not needed
+        return self._attackers_to(board,king_square,occupied,occupied^friendly,w_to_move) != 0
 
     #returns friendly pieces that are pinned to the friendly king
-    def _absolute_pins(self, king_square_index: int, occ: u64, friendly: u64, enemy_rook_queen: u64, enemy_bishop_queen:u64)->u64:
+    def _absolute_pins(self, king_square_index: int, occ: int, friendly: int, enemy_rook_queen: int, enemy_bishop_queen:int)->int:
         '''Returns friendly pieces that are pinned to the friendly king'''
-        pinned = u64(0)
+        pinned = 0
         attackers = self._x_ray_attacks(king_square_index,occ,friendly,True) & enemy_rook_queen
         attacker_squares = bb_utils.get_piecewise_bits(attackers)
         for square in attacker_squares:
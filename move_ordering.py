@@ -0,0 +1,92 @@
+#Move ordering heuristics for the search, the better the first move the more often alpha-beta can cut off early
+#
+#Captures are ordered by MVV-LVA, most valuable victim first and the least valuable attacker breaking ties.
+#Quiet moves that caused a beta cutoff are remembered as killers for their ply and scored in a butterfly
+#history table indexed by source and destination square.
+#
+#The scores are read straight from the move code bits to avoid decoding every move:
+#   bits 0-5    source square       bits 6-8    source piece type
+#   bits 10-15  destination square  bits 16-18 destination piece type, the captured piece
+#   bits 20-23  move type
+
+from numpy import uint32 as u32
+from typing import Dict, List
+
+from chess_enums import MoveType
+
+MAX_PLY = 64
+KILLER_SLOTS = 2
+#History scores are halved once any entry passes this, so old cutoffs fade out
+HISTORY_LIMIT = 1 << 20
+
+def mvv_lva(move:u32)->int:
+    '''Capture ordering score, higher is searched first'''
+    move = int(move)
+    return ((move >> 16) & 0x7) * 8 - ((move >> 6) & 0x7)
+
+def is_capture(move:u32)->bool:
+    return (int(move) >> 20) & 0xf == MoveType.CAPTURE.value
+
+class MoveOrdering():
+    '''Killer moves, history table and cutoff counters shared by every node of a search'''
+    def __init__(self) -> None:
+        self.killers:List[List[int]] = [[0]*KILLER_SLOTS for ply in range(MAX_PLY)]
+        self.history:List[List[int]] = [[0]*64 for square in range(64)]
+        self.reset_stats()
+
+    def clear(self)->None:
+        '''Forgets all killers and history, used when starting a new game'''
+        self.__init__()
+
+    #Killers are specific to the position searched, history is kept between searches but aged
+    def new_search(self)->None:
+        self.killers = [[0]*KILLER_SLOTS for ply in range(MAX_PLY)]
+        self._age_history()
+        self.reset_stats()
+
+    def reset_stats(self)->None:
+        #indexed by remaining depth, counts of nodes that failed high and of those that did so on the first move
+        self.cutoffs:Dict[int,int] = {}
+        self.first_move_cutoffs:Dict[int,int] = {}
+
+    def get_killers(self, ply:int)->List[int]:
+        if ply >= MAX_PLY:
+            return []
+        return self.killers[ply]
+
+    def history_score(self, move:u32)->int:
+        move = int(move)
+        return self.history[move & 0x3f][(move >> 10) & 0x3f]
+
+    #Called when a move causes a beta cutoff, move_index is the position of the move in the order it was searched
+    def record_cutoff(self, move:u32, ply:int, depth:int, move_index:int)->None:
+        self.cutoffs[depth] = self.cutoffs.get(depth,0) + 1
+        if move_index == 0:
+            self.first_move_cutoffs[depth] = self.first_move_cutoffs.get(depth,0) + 1
+        if is_capture(move):
+            return
+        move = int(move) & 0xffffff
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        from_square = move & 0x3f
+        to_square = (move >> 10) & 0x3f
+        self.history[from_square][to_square] += depth * depth
+        if self.history[from_square][to_square] > HISTORY_LIMIT:
+            self._age_history()
+
+    def _age_history(self)->None:
+        self.history = [[score >> 1 for score in row] for row in self.history]
+
+    def first_move_cutoff_rates(self)->Dict[int,float]:
+        '''Returns the fraction of beta cutoffs that came from the first move searched, keyed by remaining depth'''
+        return {depth:self.first_move_cutoffs.get(depth,0) / self.cutoffs[depth] for depth in sorted(self.cutoffs)}
+
+    def get_stats(self)->Dict[str,object]:
+        total = sum(self.cutoffs.values())
+        first = sum(self.first_move_cutoffs.values())
+        return {'cutoffs':total, 'first_move_cutoffs':first,
+                'first_move_cutoff_rate':first / total if total > 0 else 0.0,
+                'rate_by_depth':self.first_move_cutoff_rates()}
@@ -0,0 +1,83 @@
+#Hands out the legal moves of a position one stage at a time so a search cutoff skips the stages it never reaches
+#
+#Stages
+#---------
+#1. The hash move from the transposition table, checked against the legal move masks before it is used
+#2. Captures, ordered by MVV-LVA
+#3. Killer moves, quiet moves that caused a cutoff in a sibling node
+#4. The remaining quiet moves, ordered by their history score when a history table is given
+#
+#The legal move masks are built once per node, each stage only encodes its own moves when it is reached.
+#The board may be changed between moves as long as it is restored before the next move is requested.
+
+from numpy import uint32 as u32
+from typing import Iterator, List
+
+import move_encoding
+import bb_utils
+from board import Board
+from move_generator import MoveGenerator
+from transposition_table import MOVE_MASK
+from move_ordering import mvv_lva
+from chess_enums import PieceType, MoveType
+
+class MovePicker():
+    '''Yields the unannotated legal moves of a position in stages: hash move, captures, killers, quiet moves'''
+    def __init__(self, move_generator:MoveGenerator, board:Board, hash_move:u32 = 0, killers:List[u32] = None,
+                 history:List[List[int]] = None) -> None:
+        self.move_generator = move_generator
+        self.board = board
+        self.hash_move = int(hash_move) & MOVE_MASK
+        self.killers = [int(killer) & MOVE_MASK for killer in (killers or []) if killer != 0]
+        self.history = history
+
+    def __iter__(self)->Iterator[u32]:
+        return self._stages()
+
+    def _stages(self)->Iterator[u32]:
+        board = self.board
+        move_masks = self.move_generator._generate_move_masks(board,board.position.w_to_move)
+        hash_move = 0
+        if self.hash_move != 0 and self._is_legal(move_masks,self.hash_move):
+            hash_move = self.hash_move
+            yield u32(hash_move)
+
+        captures = self.move_generator.generate_captures(board,move_masks)
+        captures.sort(key=mvv_lva, reverse=True)
+        for move in captures:
+            if move != hash_move:
+                yield move
+
+        killers = []
+        #captures were already tried above, so only quiet killers are played here
+        for killer in self.killers:
+            if killer == hash_move or killer in killers or move_encoding.decode_move(killer).info.move_type == MoveType.CAPTURE:
+                continue
+            if self._is_legal(move_masks,killer):
+                killers.append(killer)
+                yield u32(killer)
+
+        quiets = self.move_generator.generate_quiets(board,move_masks)
+        if self.history != None:
+            history = self.history
+            quiets.sort(key=lambda move: history[int(move) & 0x3f][(int(move) >> 10) & 0x3f], reverse=True)
+        for move in quiets:
+            if move != hash_move and move not in killers:
+                yield move
+
+    #A stored move may come from another position with the same hash bucket, so it has to match
+    #the piece on the board and a legal destination before it is played
+    def _is_legal(self, move_masks, move:int)->bool:
+        source, dest = move_encoding.decode_from_to(move)
+        if source.p_type == PieceType.EMPTY:
+            return False
+        piece = bb_utils.get_piece_from_square(self.board.position,source.square_index)
+        if piece.p_type != source.p_type or piece.p_color != source.p_color:
+            return False
+        for square, moves in move_masks[source.p_type.value-1]:
+            if square == source.square_index:
+                if moves & (1 << dest.square_index) == 0:
+                    return False
+                encoded = self.move_generator._encode_move(self.board,source.p_type.value,source.square_index,dest.square_index)
+                return encoded == move
+        return False
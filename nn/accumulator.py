@@ -0,0 +1,92 @@
+#Incremental first layer of the evaluation network
+#
+#linear1 sees one-hot piece features, so a move only changes the columns of the pieces it moves or captures.
+#The accumulator keeps the linear1 output for the pieces of every position on the board's move stack and updates it
+#by subtracting and adding those weight columns, so each evaluation only has to run layers 2 to 6.
+#The six position flags (side to move, castle rights, half move clock) change on every move, so they are left out of
+#the stack and applied when the output is read.
+#
+#King moves and any position whose parent was not computed get a full refresh, done lazily when the output is read.
+
+import numpy as np
+from typing import List
+
+from chess_enums import Color, PieceType
+
+#Features per square and number of position flags in front of them, matching data_prep.fen_to_input
+_SQUARE_FEATURES = 7
+_FLAG_COUNT = 6
+
+class Accumulator():
+    '''Keeps the linear1 output of the board's position up to date as moves are made and unmade'''
+    def __init__(self, model) -> None:
+        weight = model.linear1.weight.detach().cpu().numpy().astype(np.float32)
+        self.bias = model.linear1.bias.detach().cpu().numpy().astype(np.float32)
+        self.flag_columns = weight[:,:_FLAG_COUNT].T.copy()
+        #piece_columns[color][piece type][square] is everything a piece on that square adds to the output,
+        #the color feature is +1 for white and -1 for black, squares are stored in FEN order so index 63 - square
+        self.piece_columns = np.zeros((2,len(PieceType),64,weight.shape[0]), np.float32)
+        for square in range(64):
+            base = _FLAG_COUNT + (63 - square) * _SQUARE_FEATURES
+            for p_type in PieceType:
+                if p_type == PieceType.EMPTY:
+                    continue
+                self.piece_columns[Color.WHITE.value][p_type.value][square] = weight[:,base] + weight[:,base+p_type.value]
+                self.piece_columns[Color.BLACK.value][p_type.value][square] = weight[:,base+p_type.value] - weight[:,base]
+        #one entry per position on the board's move stack, None when it has to be refreshed before use
+        self.stack:List[np.ndarray] = []
+        self.refreshes = 0
+        self.updates = 0
+
+    def reset(self, position)->None:
+        '''Starts a new stack from the given position'''
+        self.stack = [self.refresh(position)]
+
+    def refresh(self, position)->np.ndarray:
+        '''Computes the piece part of the linear1 output from scratch'''
+        self.refreshes += 1
+        output = self.bias.copy()
+        for color in Color:
+            color_mask = position.color_masks[color.value]
+            for p_type in PieceType:
+                if p_type == PieceType.EMPTY:
+                    continue
+                bb = position.piece_masks[p_type.value] & color_mask
+                squares = []
+                while bb:
+                    low_bit = bb & -bb
+                    squares.append(low_bit.bit_length() - 1)
+                    bb ^= low_bit
+                if len(squares) > 0:
+                    output += self.piece_columns[color.value][p_type.value][squares].sum(axis=0)
+        return output
+
+    #Called by Board.make_move with the move's source and destination pieces, castles are king moves so they refresh
+    def push_move(self, source, destination)->None:
+        parent = self.stack[-1]
+        if parent is None or source.p_type == PieceType.KING:
+            self.stack.append(None)
+            return
+        self.updates += 1
+        columns = self.piece_columns[source.p_color.value][source.p_type.value]
+        output = parent - columns[source.square_index] + columns[destination.square_index]
+        if destination.p_type != PieceType.EMPTY:
+            output -= self.piece_columns[destination.p_color.value][destination.p_type.value][destination.square_index]
+        self.stack.append(output)
+
+    #A null move changes no pieces, the parent's entry is shared since entries are never changed in place
+    def push_null_move(self)->None:
+        self.stack.append(self.stack[-1])
+
+    def pop(self)->None:
+        self.stack.pop()
+
+    def output(self, position)->np.ndarray:
+        '''Returns the full linear1 output for the position at the top of the stack'''
+        pieces = self.stack[-1]
+        if pieces is None:
+            pieces = self.refresh(position)
+            self.stack[-1] = pieces
+        flags = np.array((1.0 if position.w_to_move else -1.0, position.w_k_castle, position.w_q_castle,
+                          position.b_k_castle, position.b_q_castle, position.half_move_clock/50.0), np.float32)
+        return pieces + flags @ self.flag_columns
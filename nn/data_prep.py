@@ -1,5 +1,6 @@
 #Interface for preparing the model, and formatting data into the correct input format
 
+import os
 import numpy as np
 import torch
 
@@ -46,9 +47,46 @@ def fen_to_input(fen:str):
     result = input_vector
     return torch.Tensor(result)
 
-def get_model():
+#Number of inputs to the network: 6 position flags, then 7 features for each of the 64 squares
+INPUT_SIZE = 6 + 64 * 7
+
+#Builds the same features as fen_to_input straight from the bitboards, for a batch of positions at once
+#Squares are in FEN order, a8 to h1, which is bit 63 down to bit 0, the order np.unpackbits gives for big endian words
+def positions_to_input(positions, out:np.ndarray = None)->torch.Tensor:
+    '''Returns a (len(positions), INPUT_SIZE) tensor, written into out when a large enough float32 buffer is given.
+
+    A tensor built in out shares its memory, so it is only valid until out is written again.'''
+    count = len(positions)
+    if out is None or out.shape[0] < count:
+        out = np.empty((count,INPUT_SIZE), np.float32)
+    out = out[:count]
+    #white, black, then pawn to king masks
+    masks = np.empty((count,8), '>u8')
+    flags = np.empty((count,6), np.float32)
+    for i, position in enumerate(positions):
+        masks[i] = (*position.color_masks, *position.piece_masks[1:])
+        flags[i] = (1.0 if position.w_to_move else -1.0, position.w_k_castle, position.w_q_castle,
+                    position.b_k_castle, position.b_q_castle, position.half_move_clock/50.0)
+    bits = np.unpackbits(masks.view(np.uint8), axis=1).reshape(count,8,64).astype(np.float32)
+    out[:,:6] = flags
+    squares = out[:,6:].reshape(count,64,7)
+    squares[:,:,0] = bits[:,0] - bits[:,1]
+    squares[:,:,1:] = bits[:,2:].transpose(0,2,1)
+    return torch.from_numpy(out)
+
+#Weights shipped next to this module, used unless a path is given or set in MODEL_PATH_VARIABLE
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chess_eval.pth')
+MODEL_PATH_VARIABLE = 'CHESS_EVAL_MODEL'
+
+def get_model_path(path:str = None)->str:
+    '''Returns the given path, or the path in the CHESS_EVAL_MODEL environment variable, or the default path'''
+    if path != None:
+        return path
+    return os.environ.get(MODEL_PATH_VARIABLE, DEFAULT_MODEL_PATH)
+
+def get_model(path:str = None):
     device = torch.device('cuda:0' if torch.cuda.is_available() else 'cpu')
-    with open(r".\nn\chess_eval.pth", 'rb') as f:
+    with open(get_model_path(path), 'rb') as f:
         mod = model.EvalNetwork()
         mod.load_state_dict(torch.load(f, map_location=device))
         return mod
\ No newline at end of file
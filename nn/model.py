@@ -17,7 +17,11 @@ class EvalNetwork(nn.Module):
         self.Sigmoid = nn.Sigmoid()
         
     def forward(self,x):
-        x = F.leaky_relu(self.linear1(x))
+        return self.forward_from_linear1(self.linear1(x))
+
+    #Runs the network from the output of the first layer, used when linear1 is kept up to date incrementally
+    def forward_from_linear1(self,x):
+        x = F.leaky_relu(x)
         x = F.leaky_relu(self.linear2(x))
         x = F.leaky_relu(self.linear3(x))
         x = F.leaky_relu(self.linear4(x))
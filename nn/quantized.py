@@ -0,0 +1,76 @@
+#Quantized copy of the evaluation network that runs on NumPy without torch
+#
+#Used by benchmarks/bench_quantized to report how far int8 weights move the scores and how much smaller they are.
+#The engine does not evaluate with it: NumPy integer matmuls do not use BLAS and are several times slower than the
+#float32 torch model at every batch size the search uses.
+#
+#Weights
+#---------
+#Each linear layer's weights are rounded to integers with one scale per output neuron, int16 for the first layer
+#whose inputs are mostly exact 0 and +-1 features, int8 for the rest. Biases stay float32.
+#
+#Forward pass
+#---------
+#Before each layer the activations of every position are rounded to int8 with one scale per position, the layer is
+#an int32 matmul and its result is scaled back with the position's scale times each neuron's scale.
+
+import numpy as np
+from typing import List
+
+#Largest quantized value of each integer width, the range is kept symmetric
+INT8_MAX = 127
+INT16_MAX = 32767
+
+#Matches torch.nn.functional.leaky_relu
+LEAKY_RELU_SLOPE = 0.01
+
+def _leaky_relu(x:np.ndarray)->np.ndarray:
+    return np.maximum(x, x * LEAKY_RELU_SLOPE)
+
+#Rounds each row of the matrix to integers in [-limit, limit], returns the integers and each row's scale
+def _quantize_rows(matrix:np.ndarray, limit:int):
+    scale = np.abs(matrix).max(axis=1) / limit
+    scale[scale == 0] = 1.0
+    values = np.rint(matrix / scale[:,None])
+    return values, scale.astype(np.float32)
+
+class QuantizedLayer():
+    '''One linear layer with integer weights and a float32 scale per output neuron'''
+    def __init__(self, linear, weight_max:int = INT8_MAX) -> None:
+        weight = linear.weight.detach().cpu().numpy().astype(np.float32)
+        values, self.weight_scale = _quantize_rows(weight, weight_max)
+        #stored transposed so the layer is activations @ weight
+        self.weight = np.ascontiguousarray(values.T.astype(np.int32))
+        #bytes each weight needs at its integer width
+        self.weight_bytes = 1 if weight_max <= INT8_MAX else 2
+        self.bias = linear.bias.detach().cpu().numpy().astype(np.float32)
+
+    def forward(self, x:np.ndarray)->np.ndarray:
+        values, input_scale = _quantize_rows(x, INT8_MAX)
+        output = (values.astype(np.int32) @ self.weight).astype(np.float32)
+        return output * input_scale[:,None] * self.weight_scale + self.bias
+
+class QuantizedEvalNetwork():
+    '''NumPy version of nn.model.EvalNetwork with quantized weights, takes and returns float32 arrays'''
+    def __init__(self, model) -> None:
+        self.layers:List[QuantizedLayer] = [QuantizedLayer(model.linear1, INT16_MAX)]
+        for linear in (model.linear2, model.linear3, model.linear4, model.linear5, model.linear6):
+            self.layers.append(QuantizedLayer(linear, INT8_MAX))
+
+    def __call__(self, x:np.ndarray)->np.ndarray:
+        return self.forward(x)
+
+    def forward(self, x:np.ndarray)->np.ndarray:
+        return self.forward_from_linear1(self.layers[0].forward(np.atleast_2d(x)))
+
+    #Same as EvalNetwork.forward_from_linear1, for outputs of the first layer kept by nn.accumulator
+    def forward_from_linear1(self, x:np.ndarray)->np.ndarray:
+        x = _leaky_relu(np.atleast_2d(x))
+        for layer in self.layers[1:]:
+            x = _leaky_relu(layer.forward(x))
+        return x
+
+    def size_bytes(self)->int:
+        '''Returns the size of the weights stored at their integer width along with the float32 scales and biases'''
+        return sum(layer.weight.size * layer.weight_bytes + layer.weight_scale.nbytes + layer.bias.nbytes
+                   for layer in self.layers)
@@ -0,0 +1,254 @@
+#Parallel searches over several processes
+#
+#Lazy SMP
+#---------
+#Several processes search the same root at once and share what they find through one transposition table.
+#The main search runs in the calling process, each helper process runs the same iterative deepening search with a
+#slightly different setup: odd helpers search one ply deeper and every helper starts on a different root move.
+#The helpers reach different parts of the tree first and leave their results in the shared table for the main search.
+#Once the main search finishes the helpers are stopped, and the result of the deepest completed search is played.
+#
+#
+#Root split
+#---------
+#Each root move is searched as its own task in a process pool, filling the move list the way a_b_move_search does.
+#The first move is searched alone, then the rest are handed out together. Workers share the best root score so far
+#as alpha, so a move that can't beat it is cut off early and its score is only an upper bound.
+#
+#Worker processes of both modes are started on the first search and kept until close, so the evaluation model is
+#only loaded once per worker. The move tables are published to shared memory by the main process when the workers
+#start, every worker attaches to them instead of keeping its own copy.
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import time
+from numpy import uint32 as u32
+from typing import Dict, List, Optional, Tuple
+
+from board import Board
+from search import Search, INFINITY
+from position import Position
+from move_ordering import mvv_lva, is_capture
+from search_limits import SearchLimits
+from transposition_table import TranspositionTable
+from shared_tables import SharedTables
+from chess_enums import SearchMode
+
+#Entry point of a helper process, searches each position it is sent until it receives None
+def _helper_main(helper_id:int, tt_name:str, tt_size_mb:float, tables_name:str, task_queue, result_queue, stop_event)->None:
+    table = TranspositionTable(tt_size_mb, shared_name=tt_name)
+    search = Search(SearchMode.PVS, transposition_table=table, shared_tables=tables_name)
+    search.root_move_rotation = helper_id
+    #tells the main process the tables are loaded
+    result_queue.put(helper_id)
+    while True:
+        task = task_queue.get()
+        if task == None:
+            break
+        position, max_depth, move_time = task
+        limits = SearchLimits(move_time=move_time, stop_event=stop_event)
+        start = time.perf_counter()
+        move, score = search.iterative_deepening(Board(position),max_depth,limits)
+        result_queue.put((helper_id,int(move),score,search.completed_depth,search.nodes,search.qnodes,time.perf_counter()-start))
+    table.close()
+
+def available_cpu_count()->int:
+    '''Returns the CPUs this process may run on, which respects affinity masks unlike multiprocessing.cpu_count'''
+    #sched_getaffinity is missing on Windows and macOS
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+class LazySMPSearch(Search):
+    '''PVS search that runs worker_count searches of the same root in parallel on a shared transposition table'''
+    def __init__(self, worker_count:Optional[int] = None, tt_size_mb:float = 64) -> None:
+        '''worker_count defaults to the CPUs available to this process'''
+        super().__init__(SearchMode.PVS, tt_size_mb, TranspositionTable(tt_size_mb, create_shared=True))
+        self.worker_count = max(1, worker_count if worker_count != None else available_cpu_count())
+        self.tt_size_mb = tt_size_mb
+        self.context = multiprocessing.get_context()
+        self.stop_event = self.context.Event()
+        self.result_queue = self.context.Queue()
+        self.task_queues = []
+        self.helpers = []
+        self.move_tables:SharedTables = None
+        #one entry per worker for the last search, worker 0 is the main search
+        self.worker_stats:List[Dict[str,float]] = []
+        self.elapsed = 0.0
+
+    def __enter__(self)->'LazySMPSearch':
+        return self
+
+    def __exit__(self, *exc_info)->None:
+        self.close()
+
+    def start_workers(self)->None:
+        '''Starts the helper processes and waits until they are ready, called by the first search if not called before'''
+        if len(self.helpers) > 0:
+            return
+        if self.move_tables == None:
+            self.move_tables = self.move_generator.publish_tables()
+        for helper_id in range(1,self.worker_count):
+            task_queue = self.context.Queue()
+            helper = self.context.Process(target=_helper_main, daemon=True,
+                                          args=(helper_id,self.transposition_table.shared_name(),self.tt_size_mb,
+                                                self.move_tables.name,task_queue,self.result_queue,self.stop_event))
+            helper.start()
+            self.task_queues.append(task_queue)
+            self.helpers.append(helper)
+        #wait for every helper to load its tables so the first search is not started by the main process alone
+        for helper in self.helpers:
+            self.result_queue.get()
+
+    def close(self)->None:
+        '''Stops the helper processes and frees the shared transposition table and move tables'''
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for helper in self.helpers:
+            helper.join()
+        self.task_queues = []
+        self.helpers = []
+        self.transposition_table.close(unlink=True)
+        if self.move_tables != None:
+            self.move_tables.close(unlink=True)
+            self.move_tables = None
+
+    def iterative_deepening(self, board:Board, max_depth:int, limits:SearchLimits = None)->Tuple[u32,float]:
+        '''Returns the best move and its score from white's point of view, searched by every worker in parallel'''
+        self.start_workers()
+        self.stop_event.clear()
+        move_time = limits.time_budget() if limits != None else None
+        for i, task_queue in enumerate(self.task_queues):
+            helper_id = i + 1
+            task_queue.put((board.position,max_depth + helper_id % 2,move_time))
+
+        start = time.perf_counter()
+        best_move, best_score = super().iterative_deepening(board,max_depth,limits)
+        results = [(0,best_move,best_score,self.completed_depth,self.nodes,self.qnodes,time.perf_counter()-start)]
+        self.stop_event.set()
+
+        #helpers return within a few nodes of the stop event being set
+        while len(results) < self.worker_count:
+            helper_id, move, score, depth, nodes, qnodes, elapsed = self.result_queue.get()
+            results.append((helper_id,u32(move),score,depth,nodes,qnodes,elapsed))
+        self.elapsed = time.perf_counter() - start
+        results.sort(key=lambda result: result[0])
+        self.worker_stats = [{'worker':result[0],'depth':result[3],'nodes':result[4],'qnodes':result[5],'time':result[6]}
+                             for result in results]
+
+        #the deepest completed search wins, the main search keeps ties
+        best_depth = self.completed_depth
+        for helper_id, move, score, depth, nodes, qnodes, elapsed in results[1:]:
+            if depth > best_depth and move != 0:
+                best_move, best_score, best_depth = move, score, depth
+        return (best_move,best_score)
+
+    def get_parallel_stats(self)->Dict[str,object]:
+        '''Returns the per worker node counts of the last search along with the totals'''
+        total_nodes = sum(stats['nodes'] + stats['qnodes'] for stats in self.worker_stats)
+        return {'workers':self.worker_stats, 'total_nodes':total_nodes, 'time':self.elapsed,
+                'nodes_per_second':total_nodes / self.elapsed if self.elapsed > 0 else 0.0}
+
+#Search of the root split worker process, created once by the pool initializer
+_worker_search:Search = None
+_shared_alpha = None
+#bumped by RootSplitSearch.clear_worker_tables, a worker clears its table when it sees a new value
+_table_generation = None
+_worker_generation = 0
+
+def _root_worker_init(tt_size_mb:float, shared_alpha, tables_name:str, table_generation)->None:
+    global _worker_search, _shared_alpha, _table_generation, _worker_generation
+    _worker_search = Search(SearchMode.PVS, tt_size_mb, shared_tables=tables_name)
+    _shared_alpha = shared_alpha
+    _table_generation = table_generation
+    _worker_generation = table_generation.value
+
+#Searches the subtree of one root move, scores are from the root side to move's point of view
+def _root_worker_search(packed_position:Tuple[int,...], move:int, depth:int)->Tuple[float,bool,int,int]:
+    global _worker_generation
+    search = _worker_search
+    if _table_generation.value != _worker_generation:
+        search.transposition_table.clear()
+        _worker_generation = _table_generation.value
+    search.nodes = 0
+    search.qnodes = 0
+    board = Board(Position.unpack(packed_position))
+    board.make_move(u32(move))
+    alpha = _shared_alpha.value
+    score = -search.negamax(board,-INFINITY,-alpha,depth-1,1)
+    with _shared_alpha.get_lock():
+        if score > _shared_alpha.value:
+            _shared_alpha.value = score
+    #a score at or below the alpha it was searched with is only an upper bound
+    return (score,score > alpha,search.nodes,search.qnodes)
+
+class RootSplitSearch(Search):
+    '''Full width root search that hands each root move to a pool of worker processes'''
+    def __init__(self, worker_count:Optional[int] = None, tt_size_mb:float = 16) -> None:
+        '''worker_count defaults to the CPUs available to this process'''
+        super().__init__(SearchMode.ROOT_SPLIT, tt_size_mb)
+        self.worker_count = max(1, worker_count if worker_count != None else available_cpu_count())
+        self.tt_size_mb = tt_size_mb
+        self.context = multiprocessing.get_context()
+        #best root score found so far in the current search, read and raised by every worker
+        self.shared_alpha = self.context.Value('d', -INFINITY)
+        self.table_generation = self.context.Value('i', 0)
+        self.executor:ProcessPoolExecutor = None
+        self.move_tables:SharedTables = None
+
+    def __enter__(self)->'RootSplitSearch':
+        return self
+
+    def __exit__(self, *exc_info)->None:
+        self.close()
+
+    def start_workers(self)->None:
+        '''Starts the worker pool, called by the first search if not called before'''
+        if self.executor == None:
+            if self.move_tables == None:
+                self.move_tables = self.move_generator.publish_tables()
+            self.executor = ProcessPoolExecutor(self.worker_count, mp_context=self.context, initializer=_root_worker_init,
+                                                initargs=(self.tt_size_mb,self.shared_alpha,self.move_tables.name,
+                                                          self.table_generation))
+
+    def close(self)->None:
+        '''Shuts the worker pool down and frees the shared move tables'''
+        if self.executor != None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.move_tables != None:
+            self.move_tables.close(unlink=True)
+            self.move_tables = None
+
+    def clear_worker_tables(self)->None:
+        '''Clears this search's transposition table and, before their next task, those of the workers'''
+        self.transposition_table.clear()
+        with self.table_generation.get_lock():
+            self.table_generation.value += 1
+
+    #Same move list as Search.a_b_move_search, except scores of moves that could not beat the shared alpha are upper bounds
+    def a_b_move_search(self, board:Board, depth:int = 3)->None:
+        self.start_workers()
+        self.move_list.clear()
+        self.nodes = 0
+        self.qnodes = 0
+        moves = self.move_generator.generate_moves(board)
+        if len(moves) > 0:
+            moves.sort(key=lambda move: mvv_lva(move) if is_capture(move) else -INFINITY, reverse=True)
+            self.shared_alpha.value = -INFINITY
+            packed_position = board.position.pack()
+            #the first move sets a bound for the others before they start
+            results = [self.executor.submit(_root_worker_search,packed_position,int(moves[0]),depth).result()]
+            futures = [self.executor.submit(_root_worker_search,packed_position,int(move),depth) for move in moves[1:]]
+            results += [future.result() for future in futures]
+            side = 1.0 if board.position.w_to_move else -1.0
+            scored_moves = []
+            for move, (score, exact, nodes, qnodes) in zip(moves,results):
+                self.nodes += nodes
+                self.qnodes += qnodes
+                scored_moves.append((move,side*score,exact))
+            #an exact score beats an upper bound of the same value, white plays the first move and black the last
+            scored_moves.sort(reverse=True, key=lambda x: (x[1], x[2] if side > 0 else not x[2]))
+            self.move_list.extend((move,score) for move, score, exact in scored_moves)
+        self.moves_up_to_date = True
@@ -1,14 +1,23 @@
 #Contains all board state information needed to represent a position
 
+from typing import Dict,List,Tuple
+from numpy import uint64 as u64
+
 from constants import Board as BD
 from chess_enums import GameState, PieceType, Color
+import zobrist
 
 class Position:
+    #Fixed attribute layout, positions are copied for every root search and table lookup so they are kept small
+    __slots__ = ('color_masks','piece_masks','w_to_move','w_q_castle','w_k_castle','b_q_castle','b_k_castle',
+                 'en_passant_target_index','half_move_clock','full_move_counter',
+                 'checks_up_to_date','w_in_check','b_in_check','game_state','zobrist_key')
+
     def __init__(self) -> None:
-        self.color_masks = {Color.BLACK.value:BD.DEFAULT_B, Color.WHITE.value:BD.DEFAULT_W}
-        self.piece_masks = {PieceType.PAWN.value:BD.DEFAULT_PAWN, PieceType.ROOK.value:BD.DEFAULT_ROOK, 
-                    PieceType.KNIGHT.value:BD.DEFAULT_KNIGHT, PieceType.BISHOP.value:BD.DEFAULT_BISHOP, 
-                    PieceType.QUEEN.value:BD.DEFAULT_QUEEN, PieceType.KING.value:BD.DEFAULT_KING}
+        #Bitboards are plain ints indexed by Color.value and PieceType.value, index 0 (EMPTY) of piece_masks is unused
+        self.color_masks:List[int] = [BD.DEFAULT_W, BD.DEFAULT_B]
+        self.piece_masks:List[int] = [BD.EMPTY, BD.DEFAULT_PAWN, BD.DEFAULT_KNIGHT, BD.DEFAULT_BISHOP,
+                                      BD.DEFAULT_ROOK, BD.DEFAULT_QUEEN, BD.DEFAULT_KING]
 
         self.w_to_move:bool = True
         self.w_q_castle:bool = True
@@ -23,4 +32,65 @@ class Position:
         self.w_in_check:bool = False
         self.b_in_check:bool = False
 
-        self.game_state:GameState = GameState.IN_PROGRESS
\ No newline at end of file
+        self.game_state:GameState = GameState.IN_PROGRESS
+
+        #Kept up to date incrementally by Board.make_move, must be recomputed if the masks are edited directly
+        self.zobrist_key:int = zobrist.hash_position(self)
+
+    def copy(self)->'Position':
+        '''Returns an independent copy of the position'''
+        new_position = Position.__new__(Position)
+        for attr in Position.__slots__:
+            setattr(new_position,attr,getattr(self,attr))
+        new_position.color_masks = self.color_masks[:]
+        new_position.piece_masks = self.piece_masks[:]
+        return new_position
+
+    def __deepcopy__(self, memo)->'Position':
+        return self.copy()
+
+    #Compact form for sending positions to other processes, the masks followed by the state packed into a few ints
+    #flags: bit 0 white to move, bits 1-4 castle rights in zobrist.castle_index order, bits 5-11 en passant target
+    def pack(self)->Tuple[int,...]:
+        '''Returns the position as a tuple of ints, restored with Position.unpack'''
+        flags = int(self.w_to_move)
+        flags |= zobrist.castle_index(self.w_k_castle,self.w_q_castle,self.b_k_castle,self.b_q_castle) << 1
+        flags |= self.en_passant_target_index << 5
+        return (*self.color_masks, *self.piece_masks[1:], flags, self.half_move_clock, self.full_move_counter,
+                self.game_state.value, self.zobrist_key)
+
+    @staticmethod
+    def unpack(packed:Tuple[int,...])->'Position':
+        '''Rebuilds a position from the tuple returned by pack'''
+        position = Position.__new__(Position)
+        position.color_masks = list(packed[0:2])
+        position.piece_masks = [BD.EMPTY, *packed[2:8]]
+        flags = packed[8]
+        position.w_to_move = bool(flags & 1)
+        position.w_k_castle = bool(flags & 2)
+        position.w_q_castle = bool(flags & 4)
+        position.b_k_castle = bool(flags & 8)
+        position.b_q_castle = bool(flags & 16)
+        position.en_passant_target_index = (flags >> 5) & 0x7f
+        position.half_move_clock = packed[9]
+        position.full_move_counter = packed[10]
+        position.game_state = GameState(packed[11])
+        position.zobrist_key = packed[12]
+        position.checks_up_to_date = False
+        position.w_in_check = False
+        position.b_in_check = False
+        return position
+
+    def to_u64_masks(self)->Dict[str,Dict[int,u64]]:
+        '''Returns the masks in the dict of numpy uint64 layout, keyed by enum value'''
+        return {'color':{color.value:u64(self.color_masks[color.value]) for color in Color},
+                'piece':{p_type.value:u64(self.piece_masks[p_type.value]) for p_type in PieceType if p_type != PieceType.EMPTY}}
+
+    def set_masks(self, color_masks:Dict[int,u64], piece_masks:Dict[int,u64])->None:
+        '''Loads masks of any integer type keyed by enum value, then recomputes the Zobrist key'''
+        for color in Color:
+            self.color_masks[color.value] = int(color_masks[color.value]) & BD.FULL
+        for p_type in PieceType:
+            if p_type != PieceType.EMPTY:
+                self.piece_masks[p_type.value] = int(piece_masks[p_type.value]) & BD.FULL
+        self.zobrist_key = zobrist.hash_position(self)
@@ -1,30 +1,103 @@
 #Contains the code used to search the best move given the current position
 
 from move_generator import MoveGenerator
-from evaluator import Evaluator
+from evaluator import Evaluator, PIECE_VALUES
 from board import Board
+from move_picker import MovePicker
+from move_ordering import MoveOrdering, mvv_lva, is_capture, MAX_PLY
+from search_limits import SearchLimits
+from transposition_table import TranspositionTable
+from chess_enums import SearchMode, BoundType, PieceType, Color
 from numpy import uint32 as u32
 from typing import Tuple,List
 import copy
+import math
+
+#Scores are in pawns, mate scores are offset by the ply they are found at so shorter mates are preferred
+MATE_SCORE = 10000.0
+INFINITY = float('inf')
+#Width of the zero window used to test non-PV moves, smaller than any meaningful score difference
+NULL_WINDOW = 0.001
+#Scores beyond this are mate scores, which are stored in the transposition table relative to the node instead of the root
+MATE_BOUND = MATE_SCORE - 1000
+#A capture is skipped in quiescence when even winning the piece plus this margin cannot raise alpha
+DELTA_MARGIN = 2.0
+#The null move is searched this many plies shallower than a real move would be
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+#Late move reductions only apply from this depth and to moves searched after the first few
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVE_INDEX = 3
+LMR_MAX_DEPTH = 64
+LMR_MAX_MOVES = 64
+#Reduction in plies for a quiet move by remaining depth and move index, grows with the log of both
+LMR_TABLE = [[0 if depth == 0 or index == 0 else int(0.75 + math.log(depth) * math.log(index) / 2.25)
+              for index in range(LMR_MAX_MOVES)] for depth in range(LMR_MAX_DEPTH)]
+
+#Leaf positions scored by one forward pass of the network in the batched search
+EVAL_BATCH_SIZE = 512
+
+#Nodes searched between checks of the time, node and stop limits, a few ms of search even with material evaluation
+#Reading the clock costs well under a microsecond next to the 100+ us of a node, so checking often is nearly free
+LIMIT_CHECK_INTERVAL = 16
+#Deepest iteration run when the search is only limited by time or nodes
+MAX_SEARCH_DEPTH = MAX_PLY
+
+#Raised inside the search when a limit is reached, caught by iterative deepening
+class SearchAborted(Exception):
+    pass
 
 class Search():
-    def __init__(self) -> None:
-        self.move_generator = MoveGenerator()
+    def __init__(self, search_mode:SearchMode = SearchMode.NN_ONE_PLY, tt_size_mb:float = 16,
+                 transposition_table:TranspositionTable = None, shared_tables:str = None) -> None:
+        #shared_tables names move tables published by another process, see MoveGenerator.publish_tables
+        self.move_generator = MoveGenerator(shared_tables)
         self.evaluator = Evaluator()
         self.root_node = Board()
         self.moves_up_to_date = False
         self.move_list = []
+        self.search_mode = search_mode
+        self.use_nn_eval = False
+        self.nodes = 0
+        self.qnodes = 0
+        self.use_quiescence = True
+        self.use_null_move = True
+        self.use_lmr = True
+        #with the network evaluation, keep its first layer up to date incrementally instead of running it per node
+        self.use_accumulator = True
+        self.limits:SearchLimits = None
+        self.next_limit_check = 0
+        self.completed_depth = 0
+        self.root_best_move = u32(0)
+        #root moves are rotated by this many places before the first iteration, lets parallel searches start on different moves
+        self.root_move_rotation = 0
+        #a table can be passed in to share it, for example with other search processes
+        self.transposition_table = transposition_table if transposition_table != None else TranspositionTable(tt_size_mb)
+        self.move_ordering = MoveOrdering()
 
     def update_root(self, board:Board):
         self.root_node = copy.deepcopy(board)
         self.moves_up_to_date = False
 
-    def get_new_best_move(self, board:Board, search_depth:int = 1)->Tuple[u32,float]:
-        '''searches to the specified depth and returns the next move towards the most favorable line'''
+    def get_new_best_move(self, board:Board, search_depth:int = 1, limits:SearchLimits = None)->Tuple[u32,float]:
+        '''searches to the specified depth and returns the next move towards the most favorable line
+
+        In PVS mode the limits may replace the depth with a time, clock or node budget. The other modes search
+        full width without checking any limits, so they raise ValueError when limits are given.'''
+        if self.search_mode == SearchMode.PVS:
+            if limits != None:
+                return self.get_limited_best_move(board,limits)
+            return self._pvs_best_move(board,search_depth,None)
+        if limits != None:
+            raise ValueError(f"{self.search_mode.name} search can't keep to limits, use get_limited_best_move")
         self.update_root(board)
         self.moves_up_to_date = False
         next_move = u32(0)
-        if not self.moves_up_to_date:
+        if self.search_mode == SearchMode.ROOT_SPLIT:
+            self.a_b_move_search(self.root_node,search_depth)
+        elif self.search_mode == SearchMode.NN_BATCHED:
+            self.batched_move_search(self.root_node,search_depth)
+        elif not self.moves_up_to_date:
             self.generate_move_list(board)
         if len(self.move_list) > 0:
             if board.position.w_to_move:
@@ -34,25 +107,107 @@ class Search():
         else:
             print("NO VALID MOVES")
         return next_move
-    
+
+    def get_limited_best_move(self, board:Board, limits:SearchLimits)->u32:
+        '''Returns the best move of a PVS search that stops at the limits, whatever the search mode is'''
+        search_depth = limits.depth if limits.depth != None else MAX_SEARCH_DEPTH
+        return self._pvs_best_move(board,search_depth,limits)
+
+    def _pvs_best_move(self, board:Board, search_depth:int, limits:SearchLimits)->u32:
+        self.update_root(board)
+        next_move = self.iterative_deepening(self.root_node,search_depth,limits)[0]
+        if next_move == 0:
+            print("NO VALID MOVES")
+            return next_move
+        #moves are searched without check flags, only the one that is played gets them
+        return self.move_generator.annotate_move(self.root_node,next_move)
+
+    #Runs a full width search of every root move, filling the move list with exact scores
     def a_b_move_search(self,board:Board,depth:int=3)->u32:
         self.move_list.clear()
+        self.nodes = 0
+        self.qnodes = 0
         moves = self.move_generator.generate_moves(board)
+        side = 1.0 if board.position.w_to_move else -1.0
         for move in moves:
-            new_board = board.make_move_copy(move)
-            move_score = self.a_b_max(0,0,depth,new_board)
-            self.move_list.append((move,move_score))
+            board.make_move(move)
+            move_score = -self.negamax(board,-INFINITY,INFINITY,depth-1,1)
+            board.unmake_move()
+            self.move_list.append((move,side*move_score))
         self.move_list.sort(reverse=True, key=lambda x: x[1])
         self.moves_up_to_date = True
 
     def generate_move_list(self, board:Board)->List[Tuple[u32,float]]:
         moves = self.move_generator.generate_moves(board)
         self.move_list.clear()
+        #every child is scored in one forward pass
+        inputs = []
         for m in moves:
-            self.move_list.append((m,self.evaluator.eval_board(board.make_move_copy(m),True)))
+            board.make_move(m)
+            inputs.append(self.evaluator.board_input(board))
+            board.unmake_move()
+        self.move_list = list(zip(moves,self.evaluator.eval_inputs(inputs)))
         self.move_list.sort(reverse=True, key=lambda x: x[1])
         self.moves_up_to_date = True
 
+    #Full width minimax in two passes so the network sees large batches: the tree is walked once, scoring leaf inputs
+    #EVAL_BATCH_SIZE at a time as they are collected, then the scores are backed up the tree
+    #The mode is full width by design, every leaf to the given depth is scored and no limits are checked, so only small
+    #depths are practical. Only each leaf's score is kept once its batch is scored, not its input.
+    def batched_move_search(self, board:Board, depth:int = 2)->None:
+        '''Fills the move list with each root move's minimax score from white's point of view'''
+        self.move_list.clear()
+        self.nodes = 0
+        self.qnodes = 0
+        moves = self.move_generator.generate_moves(board)
+        pending = []
+        scores = []
+        subtrees = []
+        for move in moves:
+            board.make_move(move)
+            subtrees.append(self._collect_leaves(board,depth-1,1,pending,scores))
+            board.unmake_move()
+        self._score_pending(pending,scores)
+        side = 1.0 if board.position.w_to_move else -1.0
+        for move, subtree in zip(moves,subtrees):
+            self.move_list.append((move,-side*self._back_up(subtree,scores)))
+        self.move_list.sort(reverse=True, key=lambda x: x[1])
+        self.moves_up_to_date = True
+
+    #Returns the subtree below the board with scores still missing: a leaf is (score index, side to move sign),
+    #a mate or stalemate is its score and an inner node is the list of its children
+    #Leaf inputs wait in pending until a full batch is scored into scores
+    def _collect_leaves(self, board:Board, depth:int, ply:int, pending:List, scores:List[float]):
+        if depth <= 0:
+            self.qnodes += 1
+            pending.append(self.evaluator.board_input(board))
+            leaf = (len(scores)+len(pending)-1, 1.0 if board.position.w_to_move else -1.0)
+            if len(pending) >= EVAL_BATCH_SIZE:
+                self._score_pending(pending,scores)
+            return leaf
+        self.nodes += 1
+        moves = self.move_generator.generate_moves(board,False)
+        if len(moves) == 0:
+            return -MATE_SCORE + ply if self.move_generator._get_self_in_check(board) else 0.0
+        children = []
+        for move in moves:
+            board.make_move(move)
+            children.append(self._collect_leaves(board,depth-1,ply+1,pending,scores))
+            board.unmake_move()
+        return children
+
+    def _score_pending(self, pending:List, scores:List[float])->None:
+        scores += self.evaluator.eval_inputs(pending)
+        pending.clear()
+
+    #Negamax over a collected subtree once the leaf scores are known, scores are from the side to move's point of view
+    def _back_up(self, subtree, scores:List[float])->float:
+        if isinstance(subtree,tuple):
+            return subtree[1] * scores[subtree[0]]
+        if isinstance(subtree,float):
+            return subtree
+        return max(-self._back_up(child,scores) for child in subtree)
+
     def get_move_list(self, board:Board=None):
         if not self.moves_up_to_date or board != None:
             if board != None:
@@ -60,30 +215,231 @@ class Search():
             self.generate_move_list(self.root_node)
         return self.move_list
 
-    def a_b_max(self,a:int,b:int,depth_countdown:int,board:Board)->float:
-        moves = self.move_generator.generate_moves(board)
-        if depth_countdown == 0:
-            return self.evaluator.eval_board(board)
-        for move in moves:
-            new_board = board.make_move_copy(move)
-            eval_score = self.a_b_min(a,b,depth_countdown-1,new_board)
-            if eval_score >= b:
-                return b
-            elif eval_score > a:
-                a = eval_score
-        return a
-    
-    def a_b_min(self,a:int,b:int,depth_countdown:int,board:Board)->float:
-        moves = self.move_generator.generate_moves(board)
-        if depth_countdown == 0:
-            return self.evaluator.eval_board(board)
+    #Searches one ply deeper each iteration, starting every iteration with the best move of the last one
+    #When a limit stops the search part way through an iteration, the result of the last completed one is used
+    def iterative_deepening(self, board:Board, max_depth:int, limits:SearchLimits = None)->Tuple[u32,float]:
+        '''Returns the best move and its score from white's point of view after searching to max_depth'''
+        self.nodes = 0
+        self.qnodes = 0
+        self.completed_depth = 0
+        self.move_ordering.new_search()
+        best_move = u32(0)
+        best_score = 0.0
+        moves = self.move_generator.generate_moves(board,False)
+        if len(moves) == 0:
+            return (best_move,best_score)
+        #captures first for the first iteration, later iterations lead with the previous best move
+        moves.sort(key=lambda move: mvv_lva(move) if is_capture(move) else -INFINITY, reverse=True)
+        if self.root_move_rotation != 0:
+            rotation = self.root_move_rotation % len(moves)
+            moves = moves[rotation:] + moves[:rotation]
+        side = 1.0 if board.position.w_to_move else -1.0
+        self.limits = limits
+        self.next_limit_check = LIMIT_CHECK_INTERVAL
+        if limits != None:
+            limits.start()
+        stack_size = len(board.undo_stack)
+        if self.use_nn_eval and self.use_accumulator:
+            accumulator = self.evaluator.get_accumulator()
+            accumulator.reset(board.position)
+            board.accumulator = accumulator
+        try:
+            for depth in range(1,max_depth+1):
+                #the first iteration always runs so there is a move to return
+                if depth > 1 and limits != None and not limits.can_start_iteration(depth,self.nodes+self.qnodes):
+                    break
+                if best_move != 0:
+                    moves.remove(best_move)
+                    moves.insert(0,best_move)
+                best_move,score = self._pvs_root(board,moves,depth)
+                best_score = side*score
+                self.completed_depth = depth
+        except SearchAborted:
+            board.unmake_to(stack_size)
+            if best_move == 0:
+                best_move = self.root_best_move if self.root_best_move != 0 else moves[0]
+        finally:
+            self.limits = None
+            board.accumulator = None
+        return (best_move,best_score)
+
+    #Root of the principal variation search, the first move gets the full window and the rest are proven with a null window
+    def _pvs_root(self, board:Board, moves:List[u32], depth:int)->Tuple[u32,float]:
+        alpha = -INFINITY
+        beta = INFINITY
+        best_move = moves[0]
+        self.root_best_move = u32(0)
+        for i, move in enumerate(moves):
+            board.make_move(move)
+            if i == 0:
+                score = -self.negamax(board,-beta,-alpha,depth-1,1)
+            else:
+                score = -self.negamax(board,-alpha-NULL_WINDOW,-alpha,depth-1,1)
+                if score > alpha:
+                    score = -self.negamax(board,-beta,-alpha,depth-1,1)
+            board.unmake_move()
+            if score > alpha:
+                alpha = score
+                best_move = move
+                self.root_best_move = move
+        return (best_move,alpha)
+
+    #Fail-soft negamax with principal variation search, scores are from the side to move's point of view
+    #allow_null is cleared for the reply to a null move so two null moves are never made in a row
+    def negamax(self, board:Board, alpha:float, beta:float, depth:int, ply:int, allow_null:bool = True)->float:
+        '''Returns the score of the position for the side to move, searched to the given depth'''
+        if depth <= 0:
+            if self.use_quiescence:
+                return self.quiescence(board,alpha,beta,ply)
+            self.qnodes += 1
+            return self._side_relative_eval(board)
+        self.nodes += 1
+        if self.limits != None and self.nodes + self.qnodes >= self.next_limit_check:
+            self._check_limits()
+        key = board.position.zobrist_key
+        hash_move = 0
+        entry = self.transposition_table.probe(key)
+        if entry != None:
+            hash_move = entry.move
+            if entry.depth >= depth:
+                tt_score = self._score_from_tt(entry.score,ply)
+                if entry.bound == BoundType.EXACT:
+                    return tt_score
+                elif entry.bound == BoundType.LOWER and tt_score >= beta:
+                    return tt_score
+                elif entry.bound == BoundType.UPPER and tt_score <= alpha:
+                    return tt_score
+        in_check = self.move_generator._get_self_in_check(board)
+        #only nodes searched with a null window can be pruned or reduced, PV nodes are searched in full
+        pv_node = beta - alpha > NULL_WINDOW * 1.5
+        #Null move pruning, if passing the turn still fails high a real move would too.
+        #Not used in check, or when the side to move only has pawns left since zugzwang is likely there.
+        #Only tried when the static score is already at least beta, otherwise passing rarely holds
+        if (self.use_null_move and allow_null and not pv_node and not in_check and depth >= NULL_MOVE_MIN_DEPTH
+                and beta < MATE_BOUND and self._has_non_pawn_material(board) and self._side_relative_eval(board) >= beta):
+            board.make_null_move()
+            score = -self.negamax(board,-beta,-beta+NULL_WINDOW,depth-1-NULL_MOVE_REDUCTION,ply+1,False)
+            board.unmake_null_move()
+            if score >= beta:
+                #a mate found after passing is not a proven mate
+                return beta if score > MATE_BOUND else score
+        alpha_orig = alpha
+        best_score = -INFINITY
+        best_move = u32(0)
+        move_count = 0
+        #moves are generated a stage at a time, a cutoff on an early move skips generating the rest
+        ordering = self.move_ordering
+        for move in MovePicker(self.move_generator,board,hash_move,ordering.get_killers(ply),ordering.history):
+            board.make_move(move)
+            if move_count == 0:
+                score = -self.negamax(board,-beta,-alpha,depth-1,ply+1)
+            else:
+                reduction = 0
+                #Late move reductions, quiet moves late in the order are searched shallower first
+                if (self.use_lmr and depth >= LMR_MIN_DEPTH and move_count >= LMR_MIN_MOVE_INDEX and not in_check
+                        and not is_capture(move) and not self.move_generator._get_self_in_check(board)):
+                    reduction = min(LMR_TABLE[min(depth,LMR_MAX_DEPTH-1)][min(move_count,LMR_MAX_MOVES-1)],depth-2)
+                score = -self.negamax(board,-alpha-NULL_WINDOW,-alpha,depth-1-reduction,ply+1)
+                #The reduced search beat alpha, so it is repeated at full depth before it is trusted
+                if reduction > 0 and score > alpha:
+                    score = -self.negamax(board,-alpha-NULL_WINDOW,-alpha,depth-1,ply+1)
+                #Null window failed high, the move may be better than the PV so re-search with the full window
+                if alpha < score < beta:
+                    score = -self.negamax(board,-beta,-alpha,depth-1,ply+1)
+            board.unmake_move()
+            move_count += 1
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        ordering.record_cutoff(move,ply,depth,move_count-1)
+                        break
+        if move_count == 0:
+            if in_check:
+                return -MATE_SCORE + ply
+            return 0.0
+        if best_score <= alpha_orig:
+            bound = BoundType.UPPER
+        elif best_score >= beta:
+            bound = BoundType.LOWER
+        else:
+            bound = BoundType.EXACT
+        self.transposition_table.store(key,depth,bound,self._score_to_tt(best_score,ply),best_move)
+        return best_score
+
+    #Searches captures only until the position is quiet, so leaves are not scored in the middle of an exchange
+    #The side to move may stand pat on the static score instead of capturing, except when in check
+    def quiescence(self, board:Board, alpha:float, beta:float, ply:int)->float:
+        '''Returns the score of the position for the side to move once no captures are left worth making'''
+        self.qnodes += 1
+        if self.limits != None and self.nodes + self.qnodes >= self.next_limit_check:
+            self._check_limits()
+        in_check = self.move_generator._get_self_in_check(board)
+        if in_check:
+            #every evasion has to be searched, standing pat is not an option
+            moves = self.move_generator.generate_moves(board,False)
+            if len(moves) == 0:
+                return -MATE_SCORE + ply
+            best_score = -INFINITY
+        else:
+            best_score = self._side_relative_eval(board)
+            if best_score >= beta:
+                return best_score
+            alpha = max(alpha,best_score)
+            moves = self.move_generator.generate_captures(board)
+            moves.sort(key=mvv_lva, reverse=True)
+        stand_pat = best_score
         for move in moves:
-            new_board = board.make_move_copy(move)
-            eval_score = self.a_b_max(a,b,depth_countdown-1,new_board)
-            if eval_score <= a:
-                return a
-            elif eval_score < b:
-                b = eval_score
-        return b
-        
+            #delta pruning, the capture can't raise alpha even if the victim is won for free
+            if not in_check and stand_pat + PIECE_VALUES[(int(move) >> 16) & 0x7] + DELTA_MARGIN <= alpha:
+                continue
+            board.make_move(move)
+            score = -self.quiescence(board,-beta,-alpha,ply+1)
+            board.unmake_move()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    #Called every LIMIT_CHECK_INTERVAL nodes
+    def _check_limits(self)->None:
+        self.next_limit_check = self.nodes + self.qnodes + LIMIT_CHECK_INTERVAL
+        if self.limits.should_stop(self.nodes + self.qnodes):
+            raise SearchAborted()
+
+    def stop(self)->None:
+        '''Stops a running search from another thread, the search still returns its best move so far'''
+        if self.limits != None:
+            self.limits.stop()
+
+    #True when the side to move has a piece other than pawns and the king
+    def _has_non_pawn_material(self, board:Board)->bool:
+        piece_masks = board.position.piece_masks
+        friendly = board.position.color_masks[Color.WHITE.value] if board.position.w_to_move else board.position.color_masks[Color.BLACK.value]
+        pieces = piece_masks[PieceType.KNIGHT.value]|piece_masks[PieceType.BISHOP.value]|piece_masks[PieceType.ROOK.value]|piece_masks[PieceType.QUEEN.value]
+        return pieces & friendly != 0
+
+    #Mate scores are stored as distance from the node so they stay correct when the position is reached at another ply
+    def _score_to_tt(self, score:float, ply:int)->float:
+        if score > MATE_BOUND:
+            return score + ply
+        elif score < -MATE_BOUND:
+            return score - ply
+        return score
+
+    def _score_from_tt(self, score:float, ply:int)->float:
+        if score > MATE_BOUND:
+            return score - ply
+        elif score < -MATE_BOUND:
+            return score + ply
+        return score
 
+    #Evaluator scores are from white's point of view, negamax needs them relative to the side to move
+    def _side_relative_eval(self, board:Board)->float:
+        score = float(self.evaluator.eval_board(board,self.use_nn_eval))
+        return score if board.position.w_to_move else -score
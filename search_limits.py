@@ -0,0 +1,69 @@
+#Limits on how long a search may run, either a fixed depth, a time per move, a game clock or a node budget
+#Any combination can be given, the search stops at whichever limit is reached first
+
+import threading
+import time
+from typing import Optional
+
+#Moves assumed to be left in the game when the clock has no moves to go
+DEFAULT_MOVES_TO_GO = 30
+#Kept back from the clock so communication delays do not lose on time
+CLOCK_SAFETY_MARGIN = 0.05
+#A new iteration is not started once this fraction of the time budget is used, it would rarely finish
+ITERATION_START_FRACTION = 0.5
+
+class SearchLimits():
+    '''Stop conditions for a search, times are in seconds'''
+    def __init__(self, depth:Optional[int] = None, move_time:Optional[float] = None, remaining_time:Optional[float] = None,
+                 increment:float = 0.0, moves_to_go:Optional[int] = None, nodes:Optional[int] = None,
+                 stop_event:Optional[threading.Event] = None) -> None:
+        self.depth = depth
+        self.move_time = move_time
+        self.remaining_time = remaining_time
+        self.increment = increment
+        self.moves_to_go = moves_to_go
+        self.nodes = nodes
+        #set from another thread to stop the search, the best move found so far is still returned
+        self.stop_event = stop_event if stop_event != None else threading.Event()
+        self.start_time = 0.0
+        self.deadline:Optional[float] = None
+
+    #Called when the search starts, fixes the deadline from the move time or the clock
+    def start(self)->None:
+        self.start_time = time.perf_counter()
+        budget = self.time_budget()
+        self.deadline = self.start_time + budget if budget != None else None
+
+    def time_budget(self)->Optional[float]:
+        '''Returns the seconds this move may use, or None when time is not limited'''
+        if self.move_time != None:
+            return self.move_time
+        if self.remaining_time != None:
+            moves_to_go = self.moves_to_go if self.moves_to_go else DEFAULT_MOVES_TO_GO
+            budget = self.remaining_time / moves_to_go + self.increment * 0.75
+            return max(0.0, min(budget, self.remaining_time - CLOCK_SAFETY_MARGIN))
+        return None
+
+    def elapsed(self)->float:
+        return time.perf_counter() - self.start_time
+
+    def stop(self)->None:
+        self.stop_event.set()
+
+    #Checked inside the search every few nodes
+    def should_stop(self, nodes:int)->bool:
+        if self.stop_event.is_set():
+            return True
+        if self.nodes != None and nodes >= self.nodes:
+            return True
+        return self.deadline != None and time.perf_counter() >= self.deadline
+
+    #Checked between iterations, stops early when the next iteration is unlikely to complete in time
+    def can_start_iteration(self, depth:int, nodes:int)->bool:
+        if self.depth != None and depth > self.depth:
+            return False
+        if self.should_stop(nodes):
+            return False
+        if self.deadline != None:
+            return self.elapsed() < (self.deadline - self.start_time) * ITERATION_START_FRACTION
+        return True
@@ -0,0 +1,80 @@
+#Move generator tables placed in multiprocessing.shared_memory, so many engine processes on one host keep one copy
+#
+#One process builds its MoveGenerator as usual and publishes the tables, the others pass the block's name to
+#MoveGenerator and attach zero-copy NumPy views instead of loading or generating anything.
+#
+#Layout
+#---------
+#The block is a flat uint64 array: a header with the length of every table in TABLE_NAMES order, then the tables one
+#after the other in the same order. The views are read only.
+
+from multiprocessing import shared_memory
+import numpy as np
+from typing import Dict, Optional
+
+#Every table a MoveGenerator needs, and its shape, None where the length is read from the header
+TABLE_SHAPES = {'slider_attacks':(None,), 'line_table':(64,64), 'between_table':(64,64),
+                'rook_blocker_table':(64,), 'bishop_blocker_table':(64,),
+                'rook_magics':(64,), 'bishop_magics':(64,),
+                'rook_attack_table':(64,), 'bishop_attack_table':(64,),
+                'w_pawn_attack_table':(64,), 'b_pawn_attack_table':(64,),
+                'knight_attack_table':(64,), 'king_attack_table':(64,)}
+TABLE_NAMES = tuple(TABLE_SHAPES)
+
+class SharedTables():
+    '''The move generator tables in one shared memory block, created by publish or attached by name'''
+    def __init__(self, name:str, create_size:int = 0) -> None:
+        '''Attaches to the block with the given name, create_size is only used by publish'''
+        if create_size > 0:
+            self.shared_memory = shared_memory.SharedMemory(create=True, size=create_size)
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name)
+        self.words = np.ndarray((self.shared_memory.size // 8,), np.uint64, buffer=self.shared_memory.buf)
+        self.tables:Dict[str,np.ndarray] = {}
+        if create_size == 0:
+            self._map_tables()
+
+    @classmethod
+    def publish(cls, move_generator)->'SharedTables':
+        '''Copies the generator's tables into a new shared memory block, the caller should close and unlink it'''
+        arrays = [np.asarray(getattr(move_generator,name), np.uint64).reshape(-1) for name in TABLE_NAMES]
+        header_size = len(TABLE_NAMES)
+        word_count = header_size + sum(len(array) for array in arrays)
+        tables = cls(None, create_size=word_count * 8)
+        tables.words[:header_size] = [len(array) for array in arrays]
+        start = header_size
+        for array in arrays:
+            tables.words[start:start+len(array)] = array
+            start += len(array)
+        tables._map_tables()
+        return tables
+
+    #Creates a read only view of each table from the lengths in the header
+    def _map_tables(self)->None:
+        start = len(TABLE_NAMES)
+        for i, name in enumerate(TABLE_NAMES):
+            length = int(self.words[i])
+            shape = TABLE_SHAPES[name] if None not in TABLE_SHAPES[name] else (length,)
+            view = self.words[start:start+length].reshape(shape)
+            view.flags.writeable = False
+            self.tables[name] = view
+            start += length
+
+    @property
+    def name(self)->str:
+        '''Name other processes pass to MoveGenerator to attach to these tables'''
+        return self.shared_memory.name
+
+    def size_bytes(self)->int:
+        return self.words.nbytes
+
+    def close(self, unlink:bool = False)->None:
+        '''Detaches from the block, the process that published it should also unlink it once the others are done'''
+        if self.shared_memory == None:
+            return
+        self.tables = {}
+        self.words = np.zeros(0, np.uint64)
+        self.shared_memory.close()
+        if unlink:
+            self.shared_memory.unlink()
+        self.shared_memory = None
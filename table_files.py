@@ -0,0 +1,118 @@
+#Reads and writes the move generator's lookup tables in the tables folder next to this file
+#
+#Each table is kept as a NumPy .npy file of little endian uint64, which is loaded without parsing. The slider attack
+#table is memory mapped, so it is read on demand and every process using it shares the same page cache copy.
+#The original text files stay the source of the per-square tables, convert_text_tables builds the .npy files from
+#them and is run automatically the first time a .npy file is missing.
+#
+#Slider attack table
+#---------
+#A dense layout gives every square 4096 entries, but a square only uses 2^(bits in its blocker mask) of them:
+#at most 4096 for a rook and 512 for a bishop. The slider attack table keeps just those entries in one array, all 64
+#rook squares first and then the 64 bishop squares, each square starting at the offset returned by slider_offsets.
+#It is always built from the stored magic numbers by magic_generator, so it can't get out of step with them.
+#
+#Run this file to rebuild every .npy file from the text files and magic numbers and print the slider table memory.
+
+import os
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+TABLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables')
+
+TABLE_DTYPE = np.dtype('<u8')
+
+SLIDER_TABLE = 'slider_attack_table'
+
+#Name of each table and the shape it is stored with, one entry per square, None where the length varies
+TABLE_SHAPES = {'rook_attack_table':(64,), 'bishop_attack_table':(64,),
+                'rook_blockers_table':(64,), 'bishop_blockers_table':(64,),
+                'rook_magic_numbers':(64,), 'bishop_magic_numbers':(64,),
+                SLIDER_TABLE:(None,)}
+
+#Entries per square of the dense layout, only used to report the memory saved
+DENSE_ENTRIES = 4096
+
+#Tables memory mapped instead of read into memory
+MAPPED_TABLES = (SLIDER_TABLE,)
+
+def table_path(name:str, extension:str = '.npy')->str:
+    return os.path.join(TABLES_DIR, name + extension)
+
+def _read_text_table(name:str)->Optional[np.ndarray]:
+    '''Reads a table from its original text file, None if the file is missing'''
+    if not os.path.exists(table_path(name,'.txt')):
+        return None
+    with open(table_path(name,'.txt'),'r') as f:
+        return np.array([int(line) for line in f.read().split()], TABLE_DTYPE)
+
+def _shape_matches(name:str, shape:Tuple[int,...])->bool:
+    expected = TABLE_SHAPES[name]
+    return len(shape) == len(expected) and all(e == None or e == n for e, n in zip(expected,shape))
+
+def save_table(name:str, table)->None:
+    '''Writes the table to its .npy file'''
+    array = np.asarray(table, TABLE_DTYPE)
+    if not _shape_matches(name,array.shape):
+        raise ValueError(f"{name} has shape {array.shape}, expected {TABLE_SHAPES[name]}")
+    #written under a temporary name and renamed, so another process never loads a half written file
+    temp_path = table_path(name, f'.{os.getpid()}.tmp')
+    with open(temp_path,'wb') as f:
+        np.save(f, array)
+    os.replace(temp_path, table_path(name))
+
+def load_table(name:str)->Optional[np.ndarray]:
+    '''Returns the table as a uint64 array, None if neither its .npy file nor what it is built from exists
+
+    The magic tables are read only memory maps, read them with ndarray.item to get Python ints.'''
+    path = table_path(name)
+    if not os.path.exists(path):
+        table = build_slider_table() if name == SLIDER_TABLE else _read_text_table(name)
+        if table is None:
+            return None
+        save_table(name,table)
+    #a plain ndarray view of the map, item is faster on it than on the np.memmap subclass
+    table = np.asarray(np.load(path, mmap_mode='r' if name in MAPPED_TABLES else None))
+    if not _shape_matches(name,table.shape) or table.dtype != TABLE_DTYPE:
+        raise ValueError(f"{path} holds {table.dtype} {table.shape}, expected {TABLE_DTYPE} {TABLE_SHAPES[name]}")
+    return table
+
+def slider_offsets(rook_masks:List[int], bishop_masks:List[int])->Tuple[List[int],List[int],int]:
+    '''Returns where each square's rook and bishop entries start in the slider attack table, and its length'''
+    offsets = [0]
+    for mask in rook_masks + bishop_masks:
+        offsets.append(offsets[-1] + (1 << bin(mask).count('1')))
+    return offsets[:64], offsets[64:128], offsets[128]
+
+#Builds the slider attack table from the stored magic numbers, which takes a fraction of a second
+def build_slider_table()->Optional[np.ndarray]:
+    rook_magics = load_table('rook_magic_numbers')
+    bishop_magics = load_table('bishop_magic_numbers')
+    if rook_magics is None or bishop_magics is None:
+        return None
+    #imported here since magic_generator imports this module
+    import magic_generator
+    return magic_generator.build_slider_table(rook_magics.tolist(), bishop_magics.tolist())
+
+def slider_memory_report(rook_masks:List[int], bishop_masks:List[int])->Dict[str,int]:
+    '''Returns the entries and bytes of the slider attack table next to the 64 x 4096 per piece layout it replaced'''
+    rook_offsets, bishop_offsets, size = slider_offsets(rook_masks,bishop_masks)
+    return {'rook_entries':bishop_offsets[0], 'bishop_entries':size - bishop_offsets[0],
+            'bytes':size * TABLE_DTYPE.itemsize, 'dense_bytes':2 * 64 * DENSE_ENTRIES * TABLE_DTYPE.itemsize}
+
+def convert_text_tables()->Tuple[str,...]:
+    '''Rebuilds the .npy file of every table from its text file, and the slider table from the magics'''
+    converted = []
+    for name in TABLE_SHAPES:
+        table = build_slider_table() if name == SLIDER_TABLE else _read_text_table(name)
+        if table is not None:
+            save_table(name,table)
+            converted.append(name)
+    return tuple(converted)
+
+if __name__ == "__main__":
+    for name in convert_text_tables():
+        print(f"Converted {name} to {table_path(name)}")
+    report = slider_memory_report(load_table('rook_blockers_table').tolist(),load_table('bishop_blockers_table').tolist())
+    print(f"Slider attack table: {report['rook_entries']} rook and {report['bishop_entries']} bishop entries, "
+          f"{report['bytes']/1024:.0f} KB instead of {report['dense_bytes']/1024:.0f} KB")
@@ -0,0 +1,38 @@
+#Evaluator tests, run from the repository root with: python -m pytest tests
+
+import torch
+
+import move_encoding
+from board import Board
+from evaluator import Evaluator
+from nn.model import EvalNetwork
+
+def _random_model(seed:int)->EvalNetwork:
+    torch.manual_seed(seed)
+    return EvalNetwork()
+
+def _reference_score(seed:int, board:Board)->float:
+    reference = Evaluator(cache_entries=0)
+    reference.model = _random_model(seed)
+    return reference.eval_board(board, True)
+
+#Scores cached for one model must not be returned once another model is set
+def test_model_swap_drops_cached_scores():
+    evaluator = Evaluator()
+    evaluator.model = _random_model(1)
+    old_score = evaluator.eval_board(Board(), True)
+    evaluator.model = _random_model(2)
+    new_score = _reference_score(2, Board())
+    assert new_score != old_score
+    assert evaluator.eval_board(Board(), True) == new_score
+
+#The accumulator keeps a copy of the first layer, it has to be rebuilt for a new model
+def test_model_swap_drops_accumulator():
+    evaluator = Evaluator(cache_entries=0)
+    evaluator.model = _random_model(1)
+    evaluator.get_accumulator()
+    evaluator.model = _random_model(2)
+    board = Board()
+    board.accumulator = evaluator.get_accumulator()
+    board.accumulator.reset(board.position)
+    assert abs(evaluator.eval_board(board, True) - _reference_score(2, Board())) < 1e-5
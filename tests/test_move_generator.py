@@ -0,0 +1,81 @@
+#Move generator regression tests, run from the repository root with: python -m pytest tests
+
+import pytest
+
+import zobrist
+import move_encoding
+from board import Board
+from position import Position
+from move_generator import MoveGenerator
+from chess_enums import Color, PieceType
+
+FEN_PIECES = {'p':PieceType.PAWN, 'n':PieceType.KNIGHT, 'b':PieceType.BISHOP,
+              'r':PieceType.ROOK, 'q':PieceType.QUEEN, 'k':PieceType.KING}
+
+#Builds a position from the board, side to move, castling and en passant fields of a FEN
+def _position_from_fen(fen:str)->Position:
+    placement, to_move, castling, en_passant = fen.split()[:4]
+    position = Position()
+    position.color_masks = [0, 0]
+    position.piece_masks = [0] * len(position.piece_masks)
+    for rank, row in enumerate(placement.split('/')):
+        #bit 63 is a8 and the files run from a to h towards the lower bits
+        square = 63 - rank * 8
+        for c in row:
+            if c.isdigit():
+                square -= int(c)
+                continue
+            color = Color.WHITE if c.isupper() else Color.BLACK
+            position.color_masks[color.value] |= 1 << square
+            position.piece_masks[FEN_PIECES[c.lower()].value] |= 1 << square
+            square -= 1
+    position.w_to_move = to_move == 'w'
+    position.w_k_castle = 'K' in castling
+    position.w_q_castle = 'Q' in castling
+    position.b_k_castle = 'k' in castling
+    position.b_q_castle = 'q' in castling
+    position.en_passant_target_index = 64 if en_passant == '-' else move_encoding.square_str_to_index(en_passant)
+    position.zobrist_key = zobrist.hash_position(position)
+    return position
+
+def _move_strings(move_generator:MoveGenerator, fen:str):
+    board = Board(_position_from_fen(fen))
+    return sorted(move_encoding.decode_to_string_simple(move) for move in move_generator.generate_moves(board))
+
+def _perft(move_generator:MoveGenerator, board:Board, depth:int)->int:
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in move_generator.generate_moves(board):
+        board.make_move(move)
+        nodes += _perft(move_generator, board, depth-1)
+        board.unmake_move()
+    return nodes
+
+@pytest.fixture(scope='module')
+def move_generator()->MoveGenerator:
+    return MoveGenerator()
+
+#A pawn on its starting rank whose single push is blocked can't double push, and must not get a move to the
+#square bitscan_fwd(0) = 64 shifts onto
+@pytest.mark.parametrize('fen', ['4k3/p7/P7/8/8/8/8/4K3 b - - 0 1', '4k3/p6p/P6P/8/8/8/8/4K3 b - - 0 1',
+                                 '4k3/8/8/8/8/p7/P7/4K3 w - - 0 1', '4k3/8/8/8/8/p6p/P6P/4K3 w - - 0 1'])
+def test_blocked_pawn_has_no_push(move_generator, fen):
+    assert not any(move.split()[0] == 'PAWN' for move in _move_strings(move_generator, fen))
+
+def test_pawn_pushes_from_starting_rank(move_generator):
+    moves = _move_strings(move_generator, '4k3/p7/8/8/8/8/7P/4K3 b - - 0 1')
+    assert [move for move in moves if move.startswith('PAWN')] == ['PAWN a7 to a5', 'PAWN a7 to a6']
+    moves = _move_strings(move_generator, '4k3/p7/8/7p/8/8/7P/4K3 w - - 0 1')
+    assert [move for move in moves if move.startswith('PAWN')] == ['PAWN h2 to h3', 'PAWN h2 to h4']
+
+#Counts from the Chess Programming Wiki perft results, at depths without en passant captures or underpromotions,
+#which the generator does not produce
+@pytest.mark.parametrize('fen,depth,nodes', [
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 3, 8902),
+    ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', 1, 48),
+    ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', 2, 191),
+    ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', 1, 6),
+    ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10', 2, 2079)])
+def test_perft(move_generator, fen, depth, nodes):
+    assert _perft(move_generator, Board(_position_from_fen(fen)), depth) == nodes
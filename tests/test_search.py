@@ -0,0 +1,83 @@
+#Search limit tests, run from the repository root with: python -m pytest tests
+
+import time
+import threading
+import pytest
+
+import move_encoding
+from board import Board
+from search import Search
+from game_engine import GameEngine
+from evaluator import Evaluator
+from search_limits import SearchLimits
+from chess_enums import SearchMode
+
+#Time a search may run past its limit, many limit check intervals even on a slow machine
+STOP_TOLERANCE = 0.05
+#Seconds before the stop event is set from another thread
+STOP_DELAY = 0.3
+
+#A new search for every test, so no test is sped up by the transposition table of another
+@pytest.fixture
+def search()->Search:
+    return Search(SearchMode.PVS)
+
+def _timed_search(search:Search, limits:SearchLimits):
+    start = time.perf_counter()
+    move, score = search.iterative_deepening(Board(), 64, limits)
+    return move, time.perf_counter() - start
+
+@pytest.mark.parametrize('move_time', [0.05, 0.2, 0.5])
+def test_move_time_is_kept(search, move_time):
+    move, elapsed = _timed_search(search, SearchLimits(move_time=move_time))
+    assert move != 0
+    assert elapsed < move_time + STOP_TOLERANCE
+
+def test_stop_event_stops_search(search):
+    stop_event = threading.Event()
+    timer = threading.Timer(STOP_DELAY, stop_event.set)
+    timer.start()
+    move, elapsed = _timed_search(search, SearchLimits(stop_event=stop_event))
+    timer.cancel()
+    assert move != 0
+    assert elapsed < STOP_DELAY + STOP_TOLERANCE
+
+def test_stop_event_set_before_search(search):
+    stop_event = threading.Event()
+    stop_event.set()
+    move, elapsed = _timed_search(search, SearchLimits(stop_event=stop_event))
+    assert move != 0
+    assert elapsed < STOP_TOLERANCE
+
+#The engine's default search mode has no limit checks of its own, given limits it has to run a PVS search
+def test_engine_move_keeps_move_time():
+    engine = GameEngine()
+    start = time.perf_counter()
+    move = engine.make_engine_move(SearchLimits(move_time=0.2))
+    assert move != 0
+    assert time.perf_counter() - start < 0.2 + STOP_TOLERANCE
+    assert len(engine.board.undo_stack) == 1
+
+@pytest.mark.parametrize('mode', [SearchMode.NN_ONE_PLY, SearchMode.ROOT_SPLIT, SearchMode.NN_BATCHED])
+def test_limits_rejected_by_full_width_modes(mode):
+    with pytest.raises(ValueError):
+        Search(mode).get_new_best_move(Board(), 2, SearchLimits(move_time=0.1))
+
+#Leaves are scored in batches while the tree is walked, the batch size must not change the result
+def test_batched_search_independent_of_batch_size(monkeypatch):
+    import torch
+    import search as search_module
+    from nn.model import EvalNetwork
+    torch.manual_seed(1)
+    model = EvalNetwork()
+    move_lists = []
+    for batch_size in (7, 4096):
+        monkeypatch.setattr(search_module, 'EVAL_BATCH_SIZE', batch_size)
+        batched = Search(SearchMode.NN_BATCHED)
+        batched.evaluator = Evaluator(cache_entries=0)
+        batched.evaluator.model = model
+        batched.batched_move_search(Board(), 2)
+        move_lists.append(dict(batched.move_list))
+    assert len(move_lists[0]) == 20
+    #float32 sums come out slightly differently for other batch sizes
+    assert move_lists[0] == pytest.approx(move_lists[1], abs=1e-4)
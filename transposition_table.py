@@ -0,0 +1,148 @@
+#Fixed size table of previously searched positions, keyed by the 64 bit Zobrist hash of the position
+#
+#Layout
+#---------
+#The table is a flat uint64 array split into buckets of two slots, each slot is two words (key XOR data, data).
+#A bucket is selected by the low bits of the key, so the number of buckets is always a power of two.
+#The data word packs the entry:
+#   bits 0-23   move code without its check flags (source, destination and move type)
+#   bits 24-25  bound type
+#   bits 26-31  search depth
+#   bits 32-63  score as a float32
+#
+#Replacement policy
+#---------
+#Slot 0 is depth-preferred, it is only replaced by an entry searched at least as deep as the one it holds.
+#Slot 1 is always-replace, it takes every entry that is not allowed into slot 0.
+#An entry for a position already in the bucket always overwrites that slot.
+#
+#Sharing between processes
+#---------
+#The table can be placed in multiprocessing.shared_memory so several search processes use it at once without locks.
+#The key word holds key XOR data, so a slot whose two words were written by different processes at the same time
+#no longer matches its key and is treated as a miss instead of returning a corrupt entry.
+
+import collections
+import struct
+from multiprocessing import shared_memory
+import numpy as np
+from numpy import uint32 as u32, uint64 as u64
+from typing import Dict, Optional
+
+from chess_enums import BoundType
+
+TTEntry = collections.namedtuple('TTEntry', ['depth','bound','score','move'])
+
+#Move code bits that are stored, check flags are left out since they do not identify the move
+MOVE_MASK = 0xffffff
+MAX_DEPTH = 63
+
+_WORDS_PER_BUCKET = 4
+_BYTES_PER_BUCKET = _WORDS_PER_BUCKET * 8
+
+_float_struct = struct.Struct('<f')
+_uint_struct = struct.Struct('<I')
+
+def _pack(depth:int, bound:BoundType, score:float, move:u32)->int:
+    score_bits = _uint_struct.unpack(_float_struct.pack(score))[0]
+    return (int(move) & MOVE_MASK) | (bound.value << 24) | (min(depth,MAX_DEPTH) << 26) | (score_bits << 32)
+
+def _unpack(data:int)->TTEntry:
+    score = _float_struct.unpack(_uint_struct.pack(data >> 32))[0]
+    return TTEntry((data >> 26) & 0x3f, BoundType((data >> 24) & 0x3), score, u32(data & MOVE_MASK))
+
+class TranspositionTable():
+    '''Fixed size hash table of search results with depth-preferred and always-replace slots'''
+    def __init__(self, size_mb:float = 16, shared_name:Optional[str] = None, create_shared:bool = False) -> None:
+        '''With create_shared the table is placed in new shared memory, with shared_name an existing shared table is attached'''
+        #Round down to a power of two number of buckets so the index is a simple mask
+        bucket_count = max(1, int(size_mb * 1024 * 1024) // _BYTES_PER_BUCKET)
+        self.bucket_count = 1 << (bucket_count.bit_length() - 1)
+        self.index_mask = self.bucket_count - 1
+        self.size_mb = size_mb
+        self.shared_memory:Optional[shared_memory.SharedMemory] = None
+        word_count = self.bucket_count * _WORDS_PER_BUCKET
+        if create_shared or shared_name != None:
+            self.shared_memory = shared_memory.SharedMemory(name=shared_name, create=create_shared, size=word_count * 8)
+            self.table = np.ndarray((word_count,), u64, buffer=self.shared_memory.buf)
+            if create_shared:
+                self.table.fill(0)
+        else:
+            self.table = np.zeros(word_count, u64)
+        self.reset_stats()
+
+    def shared_name(self)->Optional[str]:
+        '''Name other processes pass to attach to this table, None when the table is not shared'''
+        return self.shared_memory.name if self.shared_memory != None else None
+
+    def close(self, unlink:bool = False)->None:
+        '''Detaches from shared memory, the process that created the table should also unlink it'''
+        if self.shared_memory == None:
+            return
+        self.table = np.zeros(0, u64)
+        self.shared_memory.close()
+        if unlink:
+            self.shared_memory.unlink()
+        self.shared_memory = None
+
+    def size_bytes(self)->int:
+        return self.table.nbytes
+
+    def clear(self)->None:
+        '''Removes every entry from the table and resets the counters'''
+        self.table.fill(0)
+        self.reset_stats()
+
+    def reset_stats(self)->None:
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def probe(self, key:int)->TTEntry:
+        '''Returns the stored entry for the key, or None if the position is not in the table'''
+        base = (key & self.index_mask) * _WORDS_PER_BUCKET
+        table = self.table
+        for slot in (base, base+2):
+            data = table.item(slot+1)
+            if data != 0 and table.item(slot) ^ data == key:
+                self.hits += 1
+                return _unpack(data)
+        self.misses += 1
+        return None
+
+    def store(self, key:int, depth:int, bound:BoundType, score:float, move:u32)->None:
+        '''Stores a search result following the table's replacement policy'''
+        base = (key & self.index_mask) * _WORDS_PER_BUCKET
+        table = self.table
+        data = _pack(depth,bound,score,move)
+        if table.item(base) ^ table.item(base+1) == key:
+            slot = base
+        elif table.item(base+2) ^ table.item(base+3) == key:
+            slot = base+2
+        else:
+            #Deeper results earn the depth-preferred slot, everything else goes in the always-replace slot
+            old_data = table.item(base+1)
+            if old_data == 0 or depth >= (old_data >> 26) & 0x3f:
+                slot = base
+            else:
+                slot = base+2
+            if table.item(slot+1) != 0:
+                self.overwrites += 1
+        table[slot] = key ^ data
+        table[slot+1] = data
+        self.stores += 1
+
+    def hit_rate(self)->float:
+        probes = self.hits + self.misses
+        return self.hits / probes if probes > 0 else 0.0
+
+    def fill_rate(self)->float:
+        '''Returns the fraction of slots currently holding an entry'''
+        return np.count_nonzero(self.table[1::2]) / (self.bucket_count * 2)
+
+    def get_stats(self)->Dict[str,float]:
+        '''Returns the hit, miss and overwrite counters along with the table size'''
+        return {'size_mb':self.size_bytes() / (1024 * 1024), 'entries':self.bucket_count * 2,
+                'hits':self.hits, 'misses':self.misses, 'hit_rate':self.hit_rate(),
+                'stores':self.stores, 'overwrites':self.overwrites, 'fill_rate':self.fill_rate()}
@@ -0,0 +1,51 @@
+#Zobrist hashing, maps a position to a 64 bit key by XORing together random keys for each feature of the position
+#The keys are generated from a fixed seed so every process produces the same hash for the same position
+
+import random
+from typing import List
+
+from chess_enums import Color,PieceType
+
+_SEED = 0x5A0B2157
+
+_rand = random.Random(_SEED)
+
+#PIECE_KEYS[color][piece type][square index], the EMPTY piece type row is left as zeros
+PIECE_KEYS:List[List[List[int]]] = [[[0]*64 for p_type in PieceType] for color in Color]
+for color in Color:
+    for p_type in PieceType:
+        if p_type != PieceType.EMPTY:
+            PIECE_KEYS[color.value][p_type.value] = [_rand.getrandbits(64) for square in range(64)]
+
+#One key for each combination of castle rights, indexed by castle_index
+CASTLE_KEYS:List[int] = [_rand.getrandbits(64) for i in range(16)]
+
+#One key for each en passant target square, index 64 means there is no target and does not change the hash
+EN_PASSANT_KEYS:List[int] = [_rand.getrandbits(64) for i in range(64)] + [0]
+
+#XORed into the hash when black is to move
+SIDE_KEY:int = _rand.getrandbits(64)
+
+def castle_index(w_k_castle:bool, w_q_castle:bool, b_k_castle:bool, b_q_castle:bool)->int:
+    '''Packs the four castle rights into the index used for CASTLE_KEYS'''
+    return int(w_k_castle) | (int(w_q_castle) << 1) | (int(b_k_castle) << 2) | (int(b_q_castle) << 3)
+
+def hash_position(position)->int:
+    '''Returns the full Zobrist hash of the position'''
+    key = 0
+    for color in Color:
+        color_mask = position.color_masks[color.value]
+        for p_type in PieceType:
+            if p_type == PieceType.EMPTY:
+                continue
+            piece_keys = PIECE_KEYS[color.value][p_type.value]
+            bb = int(position.piece_masks[p_type.value] & color_mask)
+            while bb:
+                low_bit = bb & -bb
+                key ^= piece_keys[low_bit.bit_length() - 1]
+                bb ^= low_bit
+    key ^= CASTLE_KEYS[castle_index(position.w_k_castle,position.w_q_castle,position.b_k_castle,position.b_q_castle)]
+    key ^= EN_PASSANT_KEYS[position.en_passant_target_index]
+    if not position.w_to_move:
+        key ^= SIDE_KEY
+    return key